@@ -6,7 +6,7 @@ import warnings
 
 warnings.filterwarnings("ignore", category=FutureWarning)
 
-import os, glob
+import os, glob, uuid
 from pathlib import Path
 
 # Import openai and google_genai as main LLM services
@@ -36,10 +36,7 @@ from langchain_community.document_loaders import (
 )
 
 # text_splitter
-from langchain_text_splitters import (
-    RecursiveCharacterTextSplitter,
-    CharacterTextSplitter,
-)
+from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 # OutputParser
 from langchain_core.output_parsers import StrOutputParser
@@ -48,13 +45,8 @@ from langchain_core.output_parsers import StrOutputParser
 from langchain_community.vectorstores import Chroma
 
 # Contextual_compression
-from langchain_classic.retrievers.document_compressors import DocumentCompressorPipeline
-from langchain_community.document_transformers import (
-    EmbeddingsRedundantFilter,
-    LongContextReorder,
-)
-from langchain_classic.retrievers.document_compressors import EmbeddingsFilter
 from langchain_classic.retrievers import ContextualCompressionRetriever
+from backend.compression_retriever import VectorizedCompressionRetriever, backfill_subchunks, index_subchunks
 
 # Cohere
 from langchain_classic.retrievers.document_compressors import CohereRerank
@@ -64,6 +56,13 @@ from langchain_community.llms import Cohere
 from langchain_community.embeddings import HuggingFaceInferenceAPIEmbeddings, HuggingFaceEmbeddings
 from langchain_community.llms import HuggingFaceHub
 
+# Hybrid keyword (BM25) + vector retrieval
+from backend.keyword_index import KeywordIndex
+from backend.hybrid_retriever import HybridRetriever
+
+# Local cross-encoder reranker (CPU, no API calls)
+from backend.reranker import LocalReranker
+
 # Import streamlit
 import streamlit as st
 
@@ -92,6 +91,8 @@ dict_welcome_message = {
 list_retriever_types = [
     "Cohere reranker",
     "Contextual compression",
+    "Hybrid (keyword + vector)",
+    "Local reranker",
     "Vectorstore backed retriever",
 ]
 
@@ -472,21 +473,25 @@ def create_retriever(
     cohere_api_key="",
     cohere_model="rerank-multilingual-v2.0",
     cohere_top_n=10,
+    local_reranker_top_n=5,
 ):
     """
     create a retriever which can be a:
         - Vectorstore backed retriever: this is the base retriever.
-        - Contextual compression retriever: We wrap the the base retriever in a ContextualCompressionRetriever.
-            The compressor here is a Document Compressor Pipeline, which splits documents
+        - Contextual compression retriever: a VectorizedCompressionRetriever over the vector store, which splits documents
             to smaller chunks, removes redundant documents, filters the top relevant documents,
             and reorder the documents so that the most relevant are at beginning / end of the list.
+            Sub-chunk embeddings are computed once when the retriever is created, not per query.
         - Cohere_reranker: CohereRerank endpoint is used to reorder the results based on relevance.
+        - Hybrid (keyword + vector): BM25 keyword search over the stored chunks and the vector search are
+            merged by reciprocal rank fusion, so exact course codes and clause numbers are not missed.
+        - Local reranker: a small cross-encoder on CPU reorders the base retriever results; no network call.
 
     Parameters:
         vector_store: Chroma vector database.
         embeddings: OpenAIEmbeddings or GoogleGenerativeAIEmbeddings.
 
-        retriever_type (str): in [Vectorstore backed retriever,Contextual compression,Cohere reranker]. default = Cohere reranker
+        retriever_type (str): in [Vectorstore backed retriever,Contextual compression,Cohere reranker,Hybrid (keyword + vector),Local reranker]. default = Cohere reranker
 
         base_retreiver_search_type: search_type in ["similarity", "mmr", "similarity_score_threshold"], default = similarity.
         base_retreiver_k: The most similar vectors are returned (default k = 16).
@@ -497,6 +502,8 @@ def create_retriever(
         cohere_model (str): model used by Cohere, in ["rerank-multilingual-v2.0","rerank-english-v2.0"]
         cohere_top_n: top n documents returned bu Cohere, default = 10
 
+        local_reranker_top_n: top n documents kept by the local reranker, default = 5
+
     """
 
     base_retriever = Vectorstore_backed_retriever(
@@ -525,6 +532,22 @@ def create_retriever(
             top_n=cohere_top_n,
         )
         return cohere_retriever
+
+    elif retriever_type == "Hybrid (keyword + vector)":
+        hybrid_retriever = HybridRetriever(
+            vector_store=vector_store,
+            keyword_index=KeywordIndex.from_vector_store(vector_store),
+            k=base_retriever_k,
+            fetch_k=2 * base_retriever_k,
+        )
+        return hybrid_retriever
+
+    elif retriever_type == "Local reranker":
+        local_reranker_retriever = LocalRerank_retriever(
+            base_retriever=base_retriever,
+            top_n=local_reranker_top_n,
+        )
+        return local_reranker_retriever
     else:
         pass
 
@@ -554,45 +577,33 @@ def Vectorstore_backed_retriever(
 def create_compression_retriever(
     embeddings, base_retriever, chunk_size=500, k=16, similarity_threshold=None
 ):
-    """Build a ContextualCompressionRetriever.
-    We wrap the the base_retriever (a Vectorstore-backed retriever) in a ContextualCompressionRetriever.
-    The compressor here is a Document Compressor Pipeline, which splits documents
-    to smaller chunks, removes redundant documents, filters the top relevant documents,
-    and reorder the documents so that the most relevant are at beginning / end of the list.
+    """Build a VectorizedCompressionRetriever.
+    Retrieved documents are split to smaller chunks, redundant chunks are removed, the top relevant
+    chunks are kept, and the documents are reordered so that the most relevant are at beginning / end of the list.
+    Sub-chunks are split and embedded at ingest (or once here for an older store), not per query: a question costs a single
+    query embedding, and redundancy and relevance filtering are NumPy matrix products over the stored embeddings.
 
     Parameters:
         embeddings: OpenAIEmbeddings or GoogleGenerativeAIEmbeddings.
-        base_retriever: a Vectorstore-backed retriever.
+        base_retriever: a Vectorstore-backed retriever. Only its vectorstore and search_kwargs["k"] are used:
+            the base_k candidates are always fetched with a plain similarity query, so its search_type
+            ("mmr", "similarity_score_threshold") and score_threshold are ignored. Use similarity_threshold instead.
         chunk_size (int): Docs will be splitted into smaller chunks using a CharacterTextSplitter with a default chunk_size of 500.
-        k (int): top k relevant documents to the query are filtered using the EmbeddingsFilter. default =16.
-        similarity_threshold : similarity_threshold of the  EmbeddingsFilter. default =None
+        k (int): top k relevant documents to the query are kept. default =16.
+        similarity_threshold : minimum cosine similarity to the query. default =None
     """
 
-    # 1. splitting docs into smaller chunks
-    splitter = CharacterTextSplitter(
-        chunk_size=chunk_size, chunk_overlap=0, separator=". "
-    )
-
-    # 2. removing redundant documents
-    redundant_filter = EmbeddingsRedundantFilter(embeddings=embeddings)
-
-    # 3. filtering based on relevance to the query
-    relevant_filter = EmbeddingsFilter(
-        embeddings=embeddings, k=k, similarity_threshold=similarity_threshold
-    )
-
-    # 4. Reorder the documents
-
-    # Less relevant document will be at the middle of the list and more relevant elements at beginning / end.
-    # Reference: https://python.langchain.com/docs/modules/data_connection/retrievers/long_context_reorder
-    reordering = LongContextReorder()
-
-    # 5. create compressor pipeline and retriever
-    pipeline_compressor = DocumentCompressorPipeline(
-        transformers=[splitter, redundant_filter, relevant_filter, reordering]
-    )
-    compression_retriever = ContextualCompressionRetriever(
-        base_compressor=pipeline_compressor, base_retriever=base_retriever
+    # 1. sub-chunks are embedded at ingest; a store created before that is indexed once here
+    vector_store = base_retriever.vectorstore
+    backfill_subchunks(vector_store, embeddings, chunk_size=chunk_size)
+
+    # 2. redundancy filter, relevance filter and LongContextReorder run per query on the stored embeddings
+    compression_retriever = VectorizedCompressionRetriever(
+        vector_store=vector_store,
+        embeddings=embeddings,
+        base_k=base_retriever.search_kwargs.get("k", 16),
+        k=k,
+        similarity_threshold=similarity_threshold,
     )
 
     return compression_retriever
@@ -621,6 +632,26 @@ def CohereRerank_retriever(
     return retriever_Cohere
 
 
+def LocalRerank_retriever(base_retriever, model_name=None, top_n=5):
+    """Build a ContextualCompressionRetriever that reorders the results with a local cross-encoder
+    (sentence-transformers, CPU) instead of the Cohere endpoint.
+
+    Parameters:
+       base_retriever: a Vectorstore-backed retriever
+       model_name: cross-encoder model, default = RERANKER_MODEL or "cross-encoder/ms-marco-MiniLM-L-6-v2"
+       top_n: top n results kept after reranking. default = 5.
+    """
+
+    compressor = LocalReranker.from_env(top_n=top_n)
+    if model_name:
+        compressor.model_name = model_name
+
+    retriever_local = ContextualCompressionRetriever(
+        base_compressor=compressor, base_retriever=base_retriever
+    )
+    return retriever_local
+
+
 def chain_RAG_blocks():
     """The RAG system is composed of:
     - 1. Retrieval: includes document loaders, text splitter, vectorstore and retriever.
@@ -696,11 +727,18 @@ def chain_RAG_blocks():
                     )
 
                     try:
+                        # Explicit ids, so sub-chunks can point at their parent chunk
+                        for chunk in chunks:
+                            chunk.id = str(uuid.uuid4())
                         st.session_state.vector_store = Chroma.from_documents(
                             documents=chunks,
                             embedding=embeddings,
+                            ids=[chunk.id for chunk in chunks],
                             persist_directory=persist_directory,
                         )
+                        if st.session_state.retriever_type == "Contextual compression":
+                            # Sub-chunks of the new chunks only, embedded once here rather than per query
+                            index_subchunks(st.session_state.vector_store, embeddings, chunks)
                         st.info(
                             f"Vectorstore **{st.session_state.vector_store_name}** is created succussfully."
                         )
@@ -0,0 +1,351 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+ANSWER_CACHE_DB = Path("data/answer_cache.db")
+
+# Keys may be prefixed with a retrieval scope (e.g. a department filter);
+# semantic matches never cross scopes
+CACHE_SCOPE_SEPARATOR = "\x1f"
+
+_NUMBER_TOKEN = re.compile(r"\w*\d\w*")
+
+
+def _signature(key: str) -> Tuple[str, frozenset]:
+    # Same scope required, and tokens with digits ("unit 3", "cs301") must match
+    # exactly for a semantic hit, otherwise "unit 3 syllabus" and "unit 4 syllabus" would collide
+    scope, _, question = key.rpartition(CACHE_SCOPE_SEPARATOR)
+    return scope, frozenset(_NUMBER_TOKEN.findall(question))
+
+
+class _Entry:
+    __slots__ = ("answer", "sources", "doc_sources", "signature", "created_at", "slot")
+
+    def __init__(self, answer, sources, doc_sources, signature, created_at, slot):
+        self.answer = answer
+        self.sources = sources
+        self.doc_sources = doc_sources
+        self.signature = signature
+        self.created_at = created_at
+        self.slot = slot
+
+
+class SemanticAnswerCache:
+    """
+    Bounded answer cache with exact and semantic lookup.
+
+    Exact hits are keyed by the normalized question. On an exact miss, the
+    query embedding is compared against all cached question embeddings with a
+    single matrix-vector product, and the best match above the similarity
+    threshold is served. Entries expire after ttl_seconds and the least
+    recently used entry is evicted once max_entries is reached.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        similarity_threshold: Optional[float] = None,
+    ):
+        self.max_entries = max_entries or int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "2048"))
+        self.ttl_seconds = ttl_seconds or float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "86400"))
+        self.similarity_threshold = similarity_threshold or float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.92"))
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        # Row i of _vectors holds the unit-normalized embedding of _slot_keys[i]
+        self._vectors: Optional[np.ndarray] = None
+        self._slot_keys: List[Optional[str]] = [None] * self.max_entries
+        self._free_slots = list(range(self.max_entries - 1, -1, -1))
+
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def get_exact(self, key: str) -> Optional[Tuple[str, List[str]]]:
+        """Exact-key lookup only. Counts hits but not misses, since callers follow up with get()."""
+        with self._lock:
+            return self._get_exact(key, time.time())
+
+    def get(self, key: str, vector=None) -> Optional[Tuple[str, List[str]]]:
+        now = time.time()
+        with self._lock:
+            exact = self._get_exact(key, now)
+            if exact is not None:
+                return exact
+
+            if vector is not None and self._vectors is not None and self._entries:
+                match = self._nearest(key, vector, now)
+                if match is not None:
+                    self._entries.move_to_end(match)
+                    self.semantic_hits += 1
+                    entry = self._entries[match]
+                    return entry.answer, entry.sources
+
+            self.misses += 1
+            return None
+
+    def put(
+        self,
+        key: str,
+        answer: str,
+        sources: List[str],
+        vector=None,
+        doc_sources: Iterable[str] = (),
+        created_at: Optional[float] = None,
+    ):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            while len(self._entries) >= self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+            slot = None
+            if vector is not None:
+                vec = np.asarray(vector, dtype=np.float32)
+                norm = np.linalg.norm(vec)
+                if norm > 0:
+                    if self._vectors is not None and self._vectors.shape[1] != vec.shape[0]:
+                        self._drop_vectors()
+                    if self._vectors is None:
+                        self._vectors = np.zeros((self.max_entries, vec.shape[0]), dtype=np.float32)
+                    slot = self._free_slots.pop()
+                    self._vectors[slot] = vec / norm
+                    self._slot_keys[slot] = key
+
+            self._entries[key] = _Entry(
+                answer, list(sources), frozenset(doc_sources), _signature(key), created_at or time.time(), slot
+            )
+
+    def invalidate_source(self, source: str):
+        """Drops every answer that cited the given document."""
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if source in e.doc_sources]:
+                self._remove(key)
+
+    def invalidate_general(self):
+        """Drops answers that cited no documents; a new upload may now answer them."""
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if not e.doc_sources]:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.semantic_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.semantic_hits) / lookups, 3) if lookups else 0.0,
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _get_exact(self, key: str, now: float) -> Optional[Tuple[str, List[str]]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if now - entry.created_at > self.ttl_seconds:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.answer, entry.sources
+
+    def _nearest(self, key: str, vector, now: float) -> Optional[str]:
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0 or query.shape[0] != self._vectors.shape[1]:
+            return None
+        # Free slots are zero rows, so they score 0 and never pass the threshold
+        scores = self._vectors @ (query / norm)
+        candidates = np.flatnonzero(scores >= self.similarity_threshold)
+        if candidates.size == 0:
+            return None
+        signature = _signature(key)
+        for slot in candidates[np.argsort(-scores[candidates])]:
+            match = self._slot_keys[slot]
+            entry = self._entries[match]
+            if now - entry.created_at > self.ttl_seconds:
+                self._remove(match)
+                continue
+            if entry.signature == signature:
+                return match
+        return None
+
+    def _drop_vectors(self):
+        # A different embeddings model (e.g. EMBEDDINGS_BACKEND switched, with rows from the old
+        # one still in a shared cache): the newest model wins, older entries stay exact-match only
+        for entry in self._entries.values():
+            entry.slot = None
+        self._vectors = None
+        self._slot_keys = [None] * self.max_entries
+        self._free_slots = list(range(self.max_entries - 1, -1, -1))
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        if entry.slot is not None:
+            self._vectors[entry.slot] = 0.0
+            self._slot_keys[entry.slot] = None
+            self._free_slots.append(entry.slot)
+
+
+class SQLiteAnswerCache:
+    """
+    Answer cache shared by all uvicorn workers through a SQLite file in WAL
+    mode. Each worker keeps a local SemanticAnswerCache mirror for lookups and
+    pulls rows written by other workers when SQLite reports a change
+    (PRAGMA data_version), so a lookup that finds nothing new reads no rows.
+    Invalidations delete the shared rows and bump a generation counter, which
+    makes every worker rebuild its mirror.
+    """
+
+    def __init__(self, db_path: Path = ANSWER_CACHE_DB, local: Optional[SemanticAnswerCache] = None):
+        self.local = local or SemanticAnswerCache()
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS answers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                key TEXT UNIQUE NOT NULL,
+                answer TEXT NOT NULL,
+                sources TEXT NOT NULL,
+                doc_sources TEXT NOT NULL,
+                vector BLOB,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._conn.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('generation', 0)")
+        self._conn.commit()
+
+        self._data_version = None
+        self._generation = None
+        self._last_id = 0
+        self._sync()
+
+    def get_exact(self, key: str) -> Optional[Tuple[str, List[str]]]:
+        self._sync()
+        return self.local.get_exact(key)
+
+    def get(self, key: str, vector=None) -> Optional[Tuple[str, List[str]]]:
+        self._sync()
+        return self.local.get(key, vector)
+
+    def put(self, key: str, answer: str, sources: List[str], vector=None, doc_sources: Iterable[str] = ()):
+        now = time.time()
+        doc_sources = sorted(s for s in doc_sources if s)
+        blob = np.asarray(vector, dtype=np.float32).tobytes() if vector is not None else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers (key, answer, sources, doc_sources, vector, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, answer, json.dumps(list(sources)), json.dumps(doc_sources), blob, now),
+            )
+            # Expired rows and overflow beyond max_entries (oldest first) are dropped
+            self._conn.execute("DELETE FROM answers WHERE created_at < ?", (now - self.local.ttl_seconds,))
+            self._conn.execute(
+                "DELETE FROM answers WHERE id NOT IN (SELECT id FROM answers ORDER BY id DESC LIMIT ?)",
+                (self.local.max_entries,),
+            )
+            self._conn.commit()
+        self.local.put(key, answer, sources, vector=vector, doc_sources=doc_sources, created_at=now)
+
+    def invalidate_source(self, source: str):
+        with self._lock:
+            # One write transaction covers the delete and the generation bump
+            self._conn.execute("BEGIN IMMEDIATE")
+            rows = self._conn.execute("SELECT key, doc_sources FROM answers").fetchall()
+            stale = [(key,) for key, docs in rows if source in json.loads(docs)]
+            self._conn.executemany("DELETE FROM answers WHERE key = ?", stale)
+            self._bump_generation()
+        self.local.invalidate_source(source)
+
+    def invalidate_general(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute("DELETE FROM answers WHERE doc_sources = '[]'")
+            self._bump_generation()
+        self.local.invalidate_general()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute("DELETE FROM answers")
+            self._bump_generation()
+        self.local.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            shared = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        return {**self.local.stats(), "backend": "sqlite", "shared_entries": shared}
+
+    def __len__(self):
+        return len(self.local)
+
+    def _bump_generation(self):
+        """Bumps the generation and commits; called inside the invalidation's write transaction."""
+        generation = self._conn.execute("SELECT value FROM meta WHERE name = 'generation'").fetchone()[0]
+        if generation != self._generation:
+            # Another worker invalidated since our last sync: drop the mirror, reload on the next lookup
+            self.local.clear()
+            self._last_id = 0
+            self._data_version = None
+        # Our own invalidation is applied locally by the caller; don't rebuild for it
+        self._generation = self._conn.execute(
+            "UPDATE meta SET value = value + 1 WHERE name = 'generation' RETURNING value"
+        ).fetchone()[0]
+        self._conn.commit()
+
+    def _sync(self):
+        with self._lock:
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self._data_version:
+                return
+            self._data_version = data_version
+
+            generation = self._conn.execute("SELECT value FROM meta WHERE name = 'generation'").fetchone()[0]
+            if generation != self._generation:
+                # Another worker invalidated entries: rebuild the mirror from scratch
+                self.local.clear()
+                self._generation = generation
+                self._last_id = 0
+
+            rows = self._conn.execute(
+                "SELECT id, key, answer, sources, doc_sources, vector, created_at FROM answers "
+                "WHERE id > ? AND created_at >= ? ORDER BY id",
+                (self._last_id, time.time() - self.local.ttl_seconds),
+            ).fetchall()
+        for row_id, key, answer, sources, doc_sources, blob, created_at in rows:
+            vector = np.frombuffer(blob, dtype=np.float32) if blob is not None else None
+            self.local.put(key, answer, json.loads(sources), vector=vector,
+                           doc_sources=json.loads(doc_sources), created_at=created_at)
+            self._last_id = max(self._last_id, row_id)
+
+
+def create_answer_cache():
+    """Selects the answer cache backend from ANSWER_CACHE_BACKEND (memory or sqlite)."""
+    backend = os.getenv("ANSWER_CACHE_BACKEND", "memory").lower()
+    if backend == "sqlite":
+        return SQLiteAnswerCache(Path(os.getenv("ANSWER_CACHE_PATH", str(ANSWER_CACHE_DB))))
+    return SemanticAnswerCache()
@@ -1,15 +1,20 @@
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Union
+from typing import Optional, Tuple, Union
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from pydantic import BaseModel
 import os
-import json
-from pathlib import Path
+import threading
+import time
 from dotenv import load_dotenv
 
+from backend.user_store import create_user_repository
+
 load_dotenv()
 
 # Configuration
@@ -18,7 +23,20 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
 # Password hashing
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+# Argon2 cost parameters; unset ones keep passlib's defaults. Existing hashes
+# still verify after a change (deprecated="auto" only marks them for rehash).
+ARGON2_SETTINGS = {
+    f"argon2__{name}": int(os.getenv(f"ARGON2_{name.upper()}"))
+    for name in ("time_cost", "memory_cost", "parallelism")
+    if os.getenv(f"ARGON2_{name.upper()}")
+}
+pwd_context = CryptContext(schemes=["argon2"], deprecated="auto", **ARGON2_SETTINGS)
+
+# Argon2 is CPU- and memory-heavy, so hashing runs on a small dedicated pool
+# (argon2-cffi releases the GIL) instead of blocking the event loop. The pool
+# size also caps how much memory concurrent hashes can take.
+AUTH_HASH_WORKERS = int(os.getenv("AUTH_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+hash_executor = ThreadPoolExecutor(max_workers=AUTH_HASH_WORKERS, thread_name_prefix="auth-hash")
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -40,34 +58,55 @@ class TokenData(BaseModel):
     username: Union[str, None] = None
     role: Union[str, None] = None
 
-# File-based Database
-USERS_FILE = Path("data/users.json")
-
-def load_users():
-    if not USERS_FILE.exists():
-        # Ensure parent directory exists
-        USERS_FILE.parent.mkdir(parents=True, exist_ok=True)
-        return {}
-    try:
-        with open(USERS_FILE, "r") as f:
-            return json.load(f)
-    except:
-        return {}
-
-def save_users(users):
-    USERS_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(USERS_FILE, "w") as f:
-        json.dump(users, f, indent=4)
+
+class TokenCache:
+    """
+    LRU of verified JWT claims keyed by the raw token, so repeat requests
+    skip signature verification. Entries are dropped once the token expires.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or int(os.getenv("JWT_CACHE_MAX_ENTRIES", "10000"))
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[TokenData, float]]" = OrderedDict()
+
+    def get(self, token: str) -> Optional["TokenData"]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            token_data, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return token_data
+
+    def put(self, token: str, token_data: "TokenData", expires_at: float):
+        with self._lock:
+            self._entries[token] = (token_data, expires_at)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+user_repository = create_user_repository()
+token_cache = TokenCache()
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
-def get_user(db, username: str):
-    # db is now expected to be the loaded users dict
-    if username in db:
-        user_dict = db[username]
-        return UserInDB(**user_dict)
-    return None
+async def verify_password_async(plain_password, hashed_password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(hash_executor, verify_password, plain_password, hashed_password)
+
+async def hash_password_async(password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(hash_executor, pwd_context.hash, password)
+
+def get_user(username: str) -> Optional[UserInDB]:
+    user_dict = user_repository.get(username)
+    return UserInDB(**user_dict) if user_dict else None
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -86,16 +125,19 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        role: str = payload.get("role")
-        if username is None:
+    token_data = token_cache.get(token)
+    if token_data is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            username: str = payload.get("sub")
+            role: str = payload.get("role")
+            if username is None:
+                raise credentials_exception
+            token_data = TokenData(username=username, role=role)
+        except JWTError:
             raise credentials_exception
-        token_data = TokenData(username=username, role=role)
-    except JWTError:
-        raise credentials_exception
-    user = get_user(load_users(), username=token_data.username)
+        token_cache.put(token, token_data, payload.get("exp") or time.time() + ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+    user = get_user(token_data.username)
     if user is None:
         raise credentials_exception
     return user
@@ -115,8 +157,8 @@ router = APIRouter()
 
 @router.post("/token", response_model=Token)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
-    user = get_user(load_users(), form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = get_user(form_data.username)
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -135,20 +177,20 @@ class UserCreate(BaseModel):
 
 @router.post("/register")
 async def register_user(user_in: UserCreate):
-    users = load_users()
-    if user_in.username in users:
+    if user_repository.get(user_in.username) is not None:
         raise HTTPException(status_code=400, detail="Username already registered")
     
     if user_in.role not in ["admin", "student"]:
         raise HTTPException(status_code=400, detail="Invalid role. Must be 'admin' or 'student'.")
 
-    hashed_password = pwd_context.hash(user_in.password)
+    hashed_password = await hash_password_async(user_in.password)
     new_user = {
         "username": user_in.username,
         "role": user_in.role,
         "hashed_password": hashed_password
     }
     
-    users[user_in.username] = new_user
-    save_users(users)
+    # The store enforces uniqueness, so a concurrent registration of the same name still fails here
+    if not user_repository.add(new_user):
+        raise HTTPException(status_code=400, detail="Username already registered")
     return {"message": "User registered successfully"}
@@ -0,0 +1,118 @@
+import sys
+import os
+import time
+import asyncio
+import statistics
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from langchain_core.documents import Document
+
+from backend.answer_cache import SemanticAnswerCache
+from backend.context_packer import ContextPacker
+from backend.metrics import MetricsStore
+from backend.rate_limit import LLMQuotaGovernor
+from backend.rag_engine import RETRIEVAL_K, RAGService
+from backend.session_memory import SessionMemoryStore
+from backend.single_flight import SingleFlight
+
+# Simulated upstream latencies (seconds)
+SEARCH_LATENCY = 0.02
+LLM_LATENCY = 0.25
+CONCURRENCY_LEVELS = [1, 10, 100]
+REQUESTS_PER_CLIENT = 5
+
+
+class StubEmbeddings:
+    def embed_query(self, text):
+        time.sleep(SEARCH_LATENCY)
+        return [float(len(text)), 1.0]
+
+
+class StubVectorStore:
+    def similarity_search_by_vector_with_relevance_scores(self, vector, k=1, filter=None):
+        time.sleep(SEARCH_LATENCY)
+        return [(Document(page_content="stub", metadata={"source": "stub.pdf", "page": 1}), 0.5)]
+
+
+class StubChain:
+    def invoke(self, inputs):
+        time.sleep(LLM_LATENCY)
+        return "stub answer"
+
+    async def ainvoke(self, inputs):
+        await asyncio.sleep(LLM_LATENCY)
+        return "stub answer"
+
+
+def build_stub_service():
+    # Bypass __init__ so no API keys or network are needed
+    rag = RAGService.__new__(RAGService)
+    rag.retriever_type = "vector"
+    rag.reranker_type = "none"
+    rag.retrieval_k = RETRIEVAL_K
+    rag.embeddings = StubEmbeddings()
+    rag.vector_store = StubVectorStore()
+    rag.academic_chain = StubChain()
+    rag.executor = ThreadPoolExecutor(max_workers=int(os.getenv("RAG_EXECUTOR_WORKERS", "32")))
+    rag.metrics = MetricsStore(db_path=Path(tempfile.mkdtemp()) / "metrics.db")
+    # Similarity threshold above 1 disables semantic hits for the unique questions
+    rag.answer_cache = SemanticAnswerCache(similarity_threshold=1.01)
+    rag.session_memory = SessionMemoryStore()
+    rag.context_packer = ContextPacker()
+    # Stub LLM latency is the limit here, not a quota
+    rag.llm_governor = LLMQuotaGovernor(max_rate=1e6, burst=1000, max_wait=0)
+    rag.single_flight = SingleFlight()
+    return rag
+
+
+async def run_level(rag, clients, use_async):
+    latencies = []
+
+    async def client(client_id):
+        for i in range(REQUESTS_PER_CLIENT):
+            # Unique questions so the answer cache never short-circuits
+            question = f"unit {i} syllabus for client {client_id} {time.time_ns()}"
+            start = time.perf_counter()
+            if use_async:
+                await rag.answer_question_async(question)
+            else:
+                # Old behaviour: sync call directly on the event loop
+                rag.answer_question(question)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(c) for c in range(clients)))
+    elapsed = time.perf_counter() - start
+    return latencies, elapsed
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    idx = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[idx]
+
+
+def main():
+    rag = build_stub_service()
+    print(f"Stub latencies: search={SEARCH_LATENCY}s llm={LLM_LATENCY}s, {REQUESTS_PER_CLIENT} requests/client")
+    print(f"{'mode':<8}{'clients':>8}{'p50 (ms)':>12}{'p99 (ms)':>12}{'req/s':>10}")
+    for use_async in (False, True):
+        mode = "async" if use_async else "sync"
+        for clients in CONCURRENCY_LEVELS:
+            if not use_async and clients > 10:
+                # The blocking path serializes everything; 100 clients would take minutes
+                continue
+            latencies, elapsed = asyncio.run(run_level(rag, clients, use_async))
+            print(
+                f"{mode:<8}{clients:>8}"
+                f"{statistics.median(latencies) * 1000:>12.1f}"
+                f"{percentile(latencies, 99) * 1000:>12.1f}"
+                f"{len(latencies) / elapsed:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import sys
+import os
+import time
+import asyncio
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.answer_cache import SemanticAnswerCache
+from backend.benchmark_chat import StubChain, build_stub_service, percentile
+from backend.session_memory import SessionMemoryStore
+from backend.single_flight import SingleFlight
+
+CLASS_SIZE = int(os.getenv("COALESCING_BENCH_CLIENTS", "200"))
+QUESTION = "What are the units in DBMS?"
+
+
+class CountingChain(StubChain):
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, inputs):
+        self.calls += 1
+        return super().invoke(inputs)
+
+    async def ainvoke(self, inputs):
+        self.calls += 1
+        return await super().ainvoke(inputs)
+
+
+class NoSingleFlight(SingleFlight):
+    # Old behaviour: every caller computes its own answer
+    def do(self, key, fn):
+        return fn(), False
+
+    async def do_async(self, key, fn):
+        return await fn(), False
+
+
+def fresh_service(single_flight):
+    rag = build_stub_service()
+    rag.academic_chain = CountingChain()
+    rag.answer_cache = SemanticAnswerCache()
+    rag.session_memory = SessionMemoryStore()
+    rag.single_flight = single_flight
+    return rag
+
+
+async def ask_async(rag):
+    latencies = []
+
+    async def student(i):
+        start = time.perf_counter()
+        await rag.answer_question_async(QUESTION, session_id=f"student{i}")
+        latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(student(i) for i in range(CLASS_SIZE)))
+    return latencies
+
+
+def ask_sync(rag):
+    latencies = []
+
+    def student(i):
+        start = time.perf_counter()
+        rag.answer_question(QUESTION, session_id=f"student{i}")
+        latencies.append(time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=CLASS_SIZE) as pool:
+        list(pool.map(student, range(CLASS_SIZE)))
+    return latencies
+
+
+def main():
+    print(f"{CLASS_SIZE} students ask the same question at once")
+    print(f"{'mode':<8}{'coalescing':>12}{'LLM calls':>11}{'p50 (ms)':>10}{'p99 (ms)':>10}{'remembered':>12}")
+    for mode in ("sync", "async"):
+        for single_flight in (NoSingleFlight(), SingleFlight()):
+            rag = fresh_service(single_flight)
+            if mode == "async":
+                latencies = asyncio.run(ask_async(rag))
+            else:
+                latencies = ask_sync(rag)
+            remembered = sum(1 for i in range(CLASS_SIZE) if rag.session_memory.history(f"student{i}"))
+            print(
+                f"{mode:<8}{'on' if type(single_flight) is SingleFlight else 'off':>12}"
+                f"{rag.academic_chain.calls:>11}"
+                f"{statistics.median(latencies) * 1000:>10.1f}"
+                f"{percentile(latencies, 99) * 1000:>10.1f}"
+                f"{remembered:>12}"
+            )
+
+
+if __name__ == "__main__":
+    main()
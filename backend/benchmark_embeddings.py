@@ -0,0 +1,81 @@
+import sys
+import os
+import time
+import statistics
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.rag_engine import RAGService
+
+# Roughly the size of a real chunk (chunk_size=1600 characters)
+CHUNK_TEXT = (
+    "The Data Structures course covers arrays, linked lists, stacks, queues, trees and graphs. "
+    "Students implement each structure and analyse its time and space complexity. "
+) * 10
+NUM_CHUNKS = int(os.getenv("EMBED_BENCH_CHUNKS", "256"))
+BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+NUM_QUERIES = int(os.getenv("EMBED_BENCH_QUERIES", "20"))
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    idx = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[idx]
+
+
+def available_backends():
+    backends = []
+    if os.getenv("GOOGLE_API_KEY"):
+        backends.append("google")
+    else:
+        print("Skipping google backend: GOOGLE_API_KEY is not set")
+    try:
+        import sentence_transformers  # noqa: F401
+        backends.append("local")
+    except ImportError:
+        print("Skipping local backend: sentence-transformers is not installed")
+    return backends
+
+
+def bench_backend(rag, backend):
+    # Raw model, not CachedEmbeddings, so every call does real work
+    embeddings, model_name = rag._create_base_embeddings(backend)
+    # Unique texts so no provider-side caching can kick in
+    chunks = [f"{i} {CHUNK_TEXT}" for i in range(NUM_CHUNKS)]
+
+    embeddings.embed_query("warm up")
+    start = time.perf_counter()
+    for offset in range(0, len(chunks), BATCH_SIZE):
+        embeddings.embed_documents(chunks[offset:offset + BATCH_SIZE])
+    elapsed = time.perf_counter() - start
+
+    latencies = []
+    for i in range(NUM_QUERIES):
+        start_query = time.perf_counter()
+        embeddings.embed_query(f"what is covered in unit {i} of data structures")
+        latencies.append(time.perf_counter() - start_query)
+
+    print(
+        f"{backend:<8}{model_name[:40]:<42}"
+        f"{len(chunks) / elapsed:>14.1f}"
+        f"{statistics.median(latencies) * 1000:>12.1f}"
+        f"{percentile(latencies, 99) * 1000:>12.1f}"
+    )
+
+
+def main():
+    # Bypass __init__: only the embedding factory is needed
+    rag = RAGService.__new__(RAGService)
+    rag.google_api_key = os.getenv("GOOGLE_API_KEY")
+
+    backends = available_backends()
+    print(f"{NUM_CHUNKS} chunks of {len(CHUNK_TEXT)} chars in batches of {BATCH_SIZE}, {NUM_QUERIES} queries")
+    print(f"{'backend':<8}{'model':<42}{'chunks/s':>14}{'q p50 (ms)':>12}{'q p99 (ms)':>12}")
+    for backend in backends:
+        try:
+            bench_backend(rag, backend)
+        except Exception as e:
+            print(f"{backend:<8}failed: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import sys
+import os
+import time
+import asyncio
+import statistics
+import tempfile
+from pathlib import Path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.security import OAuth2PasswordRequestForm
+
+from backend import auth
+from backend.benchmark_chat import build_stub_service, percentile
+from backend.user_store import SQLiteUserRepository
+
+NUM_USERS = 50
+LOGIN_BURST = int(os.getenv("LOGIN_BENCH_BURST", "100"))
+CHAT_CLIENTS = 10
+
+
+async def blocking_login(form_data):
+    # Old behaviour: argon2 verify directly on the event loop
+    user = auth.get_user(form_data.username)
+    if not user or not auth.verify_password(form_data.password, user.hashed_password):
+        raise RuntimeError("login failed")
+
+
+async def login_burst(login):
+    async def one(i):
+        await login(OAuth2PasswordRequestForm(username=f"student{i % NUM_USERS}", password="password123"))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(LOGIN_BURST)))
+    return time.perf_counter() - start
+
+
+async def chat_during(rag, burst):
+    """Runs chat clients until the login burst finishes; returns (chat latencies, burst seconds)."""
+    latencies = []
+    done = asyncio.Event()
+
+    async def client(client_id):
+        i = 0
+        while not done.is_set():
+            question = f"unit {i} syllabus for client {client_id} {time.time_ns()}"
+            start = time.perf_counter()
+            await rag.answer_question_async(question)
+            latencies.append(time.perf_counter() - start)
+            i += 1
+
+    clients = [asyncio.create_task(client(c)) for c in range(CHAT_CLIENTS)]
+    elapsed = await burst
+    done.set()
+    await asyncio.gather(*clients)
+    return latencies, elapsed
+
+
+def main():
+    auth.user_repository = SQLiteUserRepository(Path(tempfile.mkdtemp()) / "users.db", legacy_file=None)
+    hashed = auth.pwd_context.hash("password123")
+    for i in range(NUM_USERS):
+        auth.user_repository.add({"username": f"student{i}", "role": "student", "hashed_password": hashed})
+
+    rag = build_stub_service()
+    print(f"argon2 settings: {auth.ARGON2_SETTINGS or 'passlib defaults'}, {auth.AUTH_HASH_WORKERS} hash workers")
+
+    baseline, _ = asyncio.run(chat_during(rag, asyncio.sleep(3)))
+    print(f"{'mode':<10}{'logins/s':>10}{'chat p50 (ms)':>16}{'chat p99 (ms)':>16}")
+    print(f"{'no logins':<10}{'-':>10}{statistics.median(baseline) * 1000:>16.1f}{percentile(baseline, 99) * 1000:>16.1f}")
+
+    for mode, login in (("blocking", blocking_login), ("pooled", auth.login_for_access_token)):
+        latencies, elapsed = asyncio.run(chat_during(rag, login_burst(login)))
+        print(
+            f"{mode:<10}{LOGIN_BURST / elapsed:>10.1f}"
+            f"{statistics.median(latencies) * 1000:>16.1f}"
+            f"{percentile(latencies, 99) * 1000:>16.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import sys
+import os
+import time
+import asyncio
+from collections import deque
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.rate_limit import LLMQuotaGovernor, QuotaExceededError
+
+# Simulated upstream: UPSTREAM_RPM calls per rolling minute, compressed into
+# a shorter window so the run takes seconds
+UPSTREAM_LIMIT = 60
+WINDOW = 2.0
+LLM_LATENCY = 0.05
+CLIENTS = 50
+DURATION = 12.0
+
+
+class QuotaError(Exception):
+    code = 429
+
+
+class StubUpstream:
+    def __init__(self):
+        self.calls = deque()
+
+    async def generate(self):
+        await asyncio.sleep(LLM_LATENCY)
+        now = time.monotonic()
+        while self.calls and self.calls[0] <= now - WINDOW:
+            self.calls.popleft()
+        if len(self.calls) >= UPSTREAM_LIMIT:
+            raise QuotaError("429 Resource has been exhausted (e.g. check quota).")
+        self.calls.append(now)
+        return "stub answer"
+
+
+async def run(governor):
+    upstream = StubUpstream()
+    counts = {"ok": 0, "upstream_429": 0, "shed": 0}
+    deadline = time.monotonic() + DURATION
+
+    async def client():
+        while time.monotonic() < deadline:
+            try:
+                if governor:
+                    await governor.acquire_async()
+                await upstream.generate()
+                counts["ok"] += 1
+                if governor:
+                    governor.record_success()
+            except QuotaExceededError:
+                counts["shed"] += 1
+                # A shed request returns immediately with a "try again" message
+                await asyncio.sleep(0.5)
+            except QuotaError as e:
+                counts["upstream_429"] += 1
+                if governor:
+                    governor.record_error(e)
+                await asyncio.sleep(0.5)
+
+    await asyncio.gather(*(client() for _ in range(CLIENTS)))
+    return counts
+
+
+def main():
+    limit_rps = UPSTREAM_LIMIT / WINDOW
+    print(f"Upstream limit {limit_rps:.0f} calls/s, {CLIENTS} clients for {DURATION:.0f}s")
+    print(f"{'mode':<26}{'ok/s':>8}{'429s':>8}{'shed':>8}")
+    configs = [
+        ("no governor", None),
+        ("governor at limit", LLMQuotaGovernor(max_rate=limit_rps, burst=5, max_wait=2.0, decrease_interval=WINDOW)),
+        ("governor 2x over limit", LLMQuotaGovernor(max_rate=limit_rps * 2, burst=5, max_wait=2.0, decrease_interval=WINDOW)),
+    ]
+    for name, governor in configs:
+        counts = asyncio.run(run(governor))
+        print(f"{name:<26}{counts['ok'] / DURATION:>8.1f}{counts['upstream_429']:>8}{counts['shed']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import sys
+import os
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.keyword_index import KeywordIndex
+
+NUM_CHUNKS = int(os.getenv("KEYWORD_BENCH_CHUNKS", "100000"))
+WORDS_PER_CHUNK = 250
+NUM_QUERIES = 200
+INGEST_BATCH = 64
+INGEST_ROUNDS = 20
+# Set KEYWORD_BENCH_SQLITE=true to measure the shared SQLite-backed index (as the app uses it)
+USE_SQLITE = os.getenv("KEYWORD_BENCH_SQLITE", "false").lower() in ("1", "true", "yes")
+VOCABULARY = ["".join(random.Random(i).choices("abcdefghijklmnopqrstuvwxyz", k=7)) for i in range(20000)] + [
+    "unit", "syllabus", "semester", "course", "exam", "marks", "regulation", "lab", "theory", "credits",
+]
+QUERIES = [
+    "What is the syllabus for CS301 unit 3?",
+    "Regulation clause 4.2.1 attendance",
+    "credits for MA-201",
+    "unit 5 lab experiments",
+    "exam marks distribution",
+]
+
+
+def make_chunk(i, rng):
+    words = rng.choices(VOCABULARY, k=WORDS_PER_CHUNK)
+    # Sprinkle in identifiers so some queries have rare exact matches
+    words.append(f"CS{300 + i % 50}")
+    words.append(f"{i % 9 + 1}.{i % 7 + 1}.{i % 5 + 1}")
+    return " ".join(words)
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    idx = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[idx]
+
+
+DEPARTMENTS = ["CSE", "ECE", "MECH"]
+
+
+def add_chunks(index, rng, start, count):
+    ids = [f"chunk-{i}" for i in range(start, start + count)]
+    texts = [make_chunk(i, rng) for i in range(start, start + count)]
+    metadatas = [{"source": f"doc{i // 50}.pdf", "department": DEPARTMENTS[i % 3]} for i in range(start, start + count)]
+    index.add(ids, texts, metadatas)
+
+
+def main():
+    rng = random.Random(42)
+    path = Path(tempfile.mkdtemp()) / "keyword_index.db" if USE_SQLITE else None
+    index = KeywordIndex(path)
+
+    start = time.perf_counter()
+    for offset in range(0, NUM_CHUNKS, 1000):
+        add_chunks(index, rng, offset, min(1000, NUM_CHUNKS - offset))
+    build = time.perf_counter() - start
+    print(f"Indexed {len(index)} chunks of ~{WORDS_PER_CHUNK} words in {build:.1f}s ({'sqlite' if path else 'memory'})")
+
+    # Nothing is built lazily: the very first queries, filtered or not, are measured too
+    print(f"{'query':<44}{'filter':>8}{'first (ms)':>12}{'p50 (ms)':>10}{'p99 (ms)':>10}")
+    for query in QUERIES:
+        for where in (None, {"department": "ECE"}):
+            latencies = []
+            for _ in range(NUM_QUERIES // len(QUERIES)):
+                start = time.perf_counter()
+                index.search(query, k=20, where=where)
+                latencies.append(time.perf_counter() - start)
+            print(
+                f"{query[:42]:<44}{'yes' if where else 'no':>8}"
+                f"{latencies[0] * 1000:>12.3f}"
+                f"{statistics.median(latencies) * 1000:>10.3f}"
+                f"{percentile(latencies, 99) * 1000:>10.3f}"
+            )
+
+    # Ingest a batch, then time the next (filtered) query, as during an upload
+    ingest, after = [], []
+    for round_number in range(INGEST_ROUNDS):
+        start = time.perf_counter()
+        add_chunks(index, rng, NUM_CHUNKS + round_number * INGEST_BATCH, INGEST_BATCH)
+        ingest.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        index.search(QUERIES[round_number % len(QUERIES)], k=20, where={"department": "ECE"})
+        after.append(time.perf_counter() - start)
+    print(f"add {INGEST_BATCH} chunks: p50 {statistics.median(ingest) * 1000:.2f} ms; "
+          f"next filtered query: p50 {statistics.median(after) * 1000:.3f} ms, max {max(after) * 1000:.3f} ms")
+
+    if path:
+        # Another worker on the same file picks the batch up on its next search
+        other = KeywordIndex(path)
+        add_chunks(index, rng, NUM_CHUNKS + INGEST_ROUNDS * INGEST_BATCH, INGEST_BATCH)
+        start = time.perf_counter()
+        other.search(QUERIES[0], k=20)
+        print(f"other worker's first query after a {INGEST_BATCH}-chunk batch: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    start = time.perf_counter()
+    index.remove_source("doc7.pdf")
+    print(f"remove_source (50 chunks): {(time.perf_counter() - start) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
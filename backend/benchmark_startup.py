@@ -0,0 +1,62 @@
+import sys
+import os
+import subprocess
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Constructing the clients makes no API calls, so a placeholder key is enough
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-placeholder")
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Modules measured in a fresh interpreter each, so earlier imports do not hide their cost
+MODULES = [
+    "backend.rag_engine",
+    "langchain_community.vectorstores",
+    "chromadb",
+    "langchain_google_genai",
+    "google.generativeai",
+    "langchain_openai",
+    "sentence_transformers",
+]
+
+
+def cold_import_seconds(module):
+    code = (
+        "import time; start = time.perf_counter(); "
+        f"import {module}; print(time.perf_counter() - start)"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    print(f"{'module':<36}{'cold import (s)':>16}")
+    for module in MODULES:
+        seconds = cold_import_seconds(module)
+        print(f"{module:<36}{'not installed' if seconds is None else f'{seconds:.2f}':>16}")
+
+    from backend.rag_engine import RAGService
+
+    start = time.perf_counter()
+    rag = RAGService()
+    construct = time.perf_counter() - start
+    timings = rag.warm_up(max_attempts=1)
+
+    print(f"\nRAGService() returned in {construct:.2f}s (LLM_PROVIDER={rag.llm_provider}, EMBEDDINGS_BACKEND={rag.embeddings_backend})")
+    if rag.startup_error:
+        print(f"warm-up error: {rag.startup_error}")
+    print(f"{'component':<36}{'init (s)':>16}")
+    for name, seconds in timings.items():
+        if name != "total":
+            print(f"{name:<36}{seconds:>16.2f}")
+    sequential = sum(seconds for name, seconds in timings.items() if name != "total")
+    print(f"{'warm-up (parallel wall time)':<36}{timings['total']:>16.2f}")
+    print(f"{'sum of components (sequential)':<36}{sequential:>16.2f}")
+    rag.metrics.stop()
+
+
+if __name__ == "__main__":
+    main()
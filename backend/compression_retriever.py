@@ -0,0 +1,172 @@
+from typing import Any, Iterable, List, Optional
+
+import numpy as np
+from chromadb.errors import NotFoundError
+from langchain_community.document_transformers import LongContextReorder
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_text_splitters import CharacterTextSplitter
+
+SUBCHUNK_SUFFIX = "_subchunks"
+# Sub-chunks embedded per embed_documents call while indexing
+INDEX_BATCH_SIZE = 64
+# Stored chunks read per page by backfill_subchunks
+BACKFILL_PAGE_SIZE = 1000
+
+
+def subchunk_collection(vector_store, create: bool = True):
+    """
+    The Chroma collection holding sub-chunk embeddings, next to the vector
+    store's own collection. With create=False, None if it does not exist.
+    """
+    name = vector_store._collection.name + SUBCHUNK_SUFFIX
+    if create:
+        return vector_store._client.get_or_create_collection(name, embedding_function=None)
+    try:
+        return vector_store._client.get_collection(name, embedding_function=None)
+    except (NotFoundError, ValueError):
+        return None
+
+
+def index_subchunks(vector_store, embeddings, documents: Iterable[Document], chunk_size: int = 500) -> int:
+    """
+    Splits the given stored chunks (Documents carrying their Chroma ids) and
+    stores the sub-chunk embeddings, so queries never have to embed them.
+    Meant to be called at ingest with each new batch of chunks. Returns the
+    number of sub-chunks added.
+    """
+    collection = subchunk_collection(vector_store)
+    splitter = CharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=0, separator=". ")
+
+    ids, texts, metadatas = [], [], []
+    for doc in documents:
+        for i, piece in enumerate(splitter.split_text(doc.page_content)):
+            ids.append(f"{doc.id}:{i}")
+            texts.append(piece)
+            metadatas.append({**(doc.metadata or {}), "parent_id": doc.id})
+
+    for start in range(0, len(ids), INDEX_BATCH_SIZE):
+        end = start + INDEX_BATCH_SIZE
+        collection.upsert(
+            ids=ids[start:end],
+            documents=texts[start:end],
+            metadatas=metadatas[start:end],
+            embeddings=embeddings.embed_documents(texts[start:end]),
+        )
+    return len(ids)
+
+
+def backfill_subchunks(vector_store, embeddings, chunk_size: int = 500) -> int:
+    """
+    One-time indexing for a store built before sub-chunks were written at
+    ingest: only runs while the sub-chunk collection is empty, and pages
+    through the stored chunks rather than loading the corpus at once.
+    Chunks it misses fall back to their own embedding at query time.
+    """
+    if subchunk_collection(vector_store).count() > 0:
+        return 0
+    added = offset = 0
+    while True:
+        page = vector_store._collection.get(include=["documents", "metadatas"], limit=BACKFILL_PAGE_SIZE, offset=offset)
+        if not page["ids"]:
+            return added
+        documents = [
+            Document(id=parent_id, page_content=text, metadata=metadata or {})
+            for parent_id, text, metadata in zip(page["ids"], page["documents"], page["metadatas"])
+        ]
+        added += index_subchunks(vector_store, embeddings, documents, chunk_size=chunk_size)
+        offset += len(page["ids"])
+
+
+def delete_subchunks(vector_store, parent_ids: Optional[Iterable[str]] = None, source: Optional[str] = None):
+    """Deletes the sub-chunks of the given parent chunks, or of every chunk from source."""
+    collection = subchunk_collection(vector_store, create=False)
+    if collection is None:
+        return
+    parent_ids = list(parent_ids or [])
+    if parent_ids:
+        collection.delete(where={"parent_id": {"$in": parent_ids}})
+    if source is not None:
+        collection.delete(where={"source": source})
+
+
+def select_relevant(
+    vectors: np.ndarray,
+    query_vector: np.ndarray,
+    k: int,
+    redundancy_threshold: float = 0.95,
+    similarity_threshold: Optional[float] = None,
+) -> List[int]:
+    """
+    Row indices of the k vectors most similar to the query, most relevant
+    first, skipping any vector nearly identical to a more relevant one.
+    Relevance and redundancy come from one normalized matrix product each.
+    """
+    if not len(vectors):
+        return []
+    matrix = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    query = query_vector / max(float(np.linalg.norm(query_vector)), 1e-12)
+    relevance = matrix @ query
+    order = np.argsort(-relevance, kind="stable")
+
+    ranked = matrix[order]
+    # similar[i, j] (i < j): lower-ranked j duplicates higher-ranked i
+    similar = np.triu(ranked @ ranked.T > redundancy_threshold, k=1)
+    keep = order[~similar.any(axis=0)]
+    if similarity_threshold is not None:
+        keep = keep[relevance[keep] >= similarity_threshold]
+    return keep[:k].tolist()
+
+
+class VectorizedCompressionRetriever(BaseRetriever):
+    """
+    Contextual compression without re-embedding: the query is embedded once,
+    the top base_k chunks come from the vector store, and their sub-chunks'
+    stored embeddings (see index_subchunks) are filtered for redundancy and
+    relevance in NumPy, then reordered with LongContextReorder.
+    """
+
+    vector_store: Any
+    embeddings: Any
+    base_k: int = 16
+    k: int = 16
+    redundancy_threshold: float = 0.95
+    similarity_threshold: Optional[float] = None
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        query_vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        parent_ids = self.vector_store._collection.query(
+            query_embeddings=[query_vector.tolist()], n_results=self.base_k, include=[]
+        )["ids"][0]
+        if not parent_ids:
+            return []
+
+        found = subchunk_collection(self.vector_store).get(
+            where={"parent_id": {"$in": parent_ids}},
+            include=["documents", "metadatas", "embeddings"],
+        )
+        texts, metadatas, vectors = list(found["documents"]), list(found["metadatas"]), list(found["embeddings"])
+
+        # Chunks without sub-chunks (e.g. ingested with sub-chunk indexing off): use the whole chunk and its stored embedding
+        covered = {metadata["parent_id"] for metadata in metadatas}
+        missing = [parent_id for parent_id in parent_ids if parent_id not in covered]
+        if missing:
+            parents = self.vector_store._collection.get(ids=missing, include=["documents", "metadatas", "embeddings"])
+            texts += parents["documents"]
+            metadatas += parents["metadatas"]
+            vectors += list(parents["embeddings"])
+
+        selected = select_relevant(
+            np.asarray(vectors, dtype=np.float32),
+            query_vector,
+            k=self.k,
+            redundancy_threshold=self.redundancy_threshold,
+            similarity_threshold=self.similarity_threshold,
+        )
+        docs = []
+        for i in selected:
+            metadata = {key: value for key, value in (metadatas[i] or {}).items() if key != "parent_id"}
+            docs.append(Document(page_content=texts[i], metadata=metadata))
+        # Less relevant documents in the middle, most relevant at the beginning / end
+        return list(LongContextReorder().transform_documents(docs))
@@ -0,0 +1,120 @@
+import functools
+import os
+from typing import List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+from backend.session_memory import estimate_tokens, format_turns
+
+# RecursiveCharacterTextSplitter uses chunk_overlap=200; allow some slack
+MAX_OVERLAP_CHARS = 400
+
+
+@functools.lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # Not installed, or the encoding file cannot be downloaded
+        return None
+
+
+def load_encoding() -> str:
+    """Loads the tokenizer (a download on first use) and returns its name; for warm-up."""
+    encoding = _encoding()
+    return encoding.name if encoding is not None else "estimate"
+
+
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    encoding = _encoding()
+    if encoding is None:
+        return text[:max_tokens * 4]
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+
+
+def _overlap(first: str, second: str) -> int:
+    """Length of the longest suffix of first that is also a prefix of second."""
+    for size in range(min(len(first), len(second), MAX_OVERLAP_CHARS), 0, -1):
+        if first.endswith(second[:size]):
+            return size
+    return 0
+
+
+def dedupe_chunks(docs: Sequence[Document], min_overlap: int = 20) -> List[Document]:
+    """
+    Drops repeated chunks and strips the text a chunk shares with a more
+    relevant neighbour from the same source (the splitter's overlap).
+    Order is preserved.
+    """
+    kept: List[Document] = []
+    seen = set()
+    for doc in docs:
+        text = doc.page_content
+        if text in seen:
+            continue
+        seen.add(text)
+        source = doc.metadata.get("source")
+        for other in kept:
+            if other.metadata.get("source") != source:
+                continue
+            head = _overlap(other.page_content, text)
+            if head >= min_overlap:
+                text = text[head:]
+            tail = _overlap(text, other.page_content)
+            if tail >= min_overlap:
+                text = text[:-tail]
+        if text.strip():
+            kept.append(Document(page_content=text.strip(), metadata=doc.metadata, id=doc.id))
+    return kept
+
+
+class ContextPacker:
+    """
+    Builds the academic prompt's context and chat history within a token
+    budget. Chunks are deduplicated and taken in relevance order; history is
+    capped separately and is the first thing cut when chunks need the room.
+    """
+
+    def __init__(self, max_tokens: Optional[int] = None, history_max_tokens: Optional[int] = None):
+        self.max_tokens = max_tokens or int(os.getenv("CONTEXT_MAX_TOKENS", "2500"))
+        self.history_max_tokens = history_max_tokens or int(os.getenv("CONTEXT_HISTORY_MAX_TOKENS", "500"))
+
+    def pack(self, docs: Sequence[Document], turns: Sequence[Tuple[str, str]]) -> Tuple[str, str, List[Document]]:
+        """Returns (context, chat history, documents used), most relevant documents first."""
+        chunks = [(doc, count_tokens(doc.page_content)) for doc in dedupe_chunks(docs)]
+        chunk_tokens = sum(tokens for _, tokens in chunks)
+
+        # History only gets what the chunks leave over, up to its own cap
+        history_budget = min(self.history_max_tokens, max(self.max_tokens - chunk_tokens, 0))
+        history, history_tokens = self._pack_history(turns, history_budget)
+
+        budget = self.max_tokens - history_tokens
+        used = []
+        for doc, tokens in chunks:
+            if tokens <= budget:
+                used.append(doc)
+                budget -= tokens
+            elif not used:
+                # Always keep the best chunk, cut to fit
+                used.append(Document(page_content=_truncate(doc.page_content, budget), metadata=doc.metadata, id=doc.id))
+                budget = 0
+        return "\n\n".join(doc.page_content for doc in used), history, used
+
+    def _pack_history(self, turns: Sequence[Tuple[str, str]], budget: int) -> Tuple[str, int]:
+        # Newest turns first; older ones are dropped when the budget runs out
+        kept, used = [], 0
+        for question, answer in reversed(turns):
+            tokens = count_tokens(format_turns([(question, answer)])) + 1
+            if used + tokens > budget:
+                break
+            kept.append((question, answer))
+            used += tokens
+        return format_turns(list(reversed(kept))), used
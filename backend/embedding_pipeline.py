@@ -0,0 +1,97 @@
+import os
+import random
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Iterable, List, Optional
+
+from langchain_core.documents import Document
+
+from backend.rate_limit import is_rate_limit_error
+
+
+class EmbeddingPipeline:
+    """
+    Embeds chunks in fixed-size batches with bounded concurrency and writes
+    each batch to Chroma as soon as its embeddings arrive. Rate-limit errors
+    (429 / ResourceExhausted) are retried with exponential backoff and jitter.
+    """
+
+    def __init__(
+        self,
+        embeddings,
+        vector_store,
+        batch_size: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        base_delay: Optional[float] = None,
+    ):
+        self.embeddings = embeddings
+        self.vector_store = vector_store
+        self.batch_size = batch_size or int(os.getenv("EMBED_BATCH_SIZE", "64"))
+        self.max_concurrency = max_concurrency or int(os.getenv("EMBED_MAX_CONCURRENCY", "4"))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("EMBED_MAX_RETRIES", "6"))
+        self.base_delay = base_delay if base_delay is not None else float(os.getenv("EMBED_RETRY_BASE_DELAY", "1.0"))
+        self.max_delay = 60.0
+
+    def run(self, chunks: Iterable[Document], total: int = 0, progress_callback=None, batch_callback=None) -> List[str]:
+        """
+        Embeds and indexes chunks, returning the ids written to the vector
+        store. At most 2 * max_concurrency batches are held in memory at once.
+        batch_callback, if given, is called with each batch after it is written.
+        """
+        report = progress_callback or (lambda done, total: None)
+        chunk_iter = iter(chunks)
+        ids: List[str] = []
+        done = 0
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="embed") as pool:
+            in_flight = {}
+            exhausted = False
+            while True:
+                while not exhausted and len(in_flight) < 2 * self.max_concurrency:
+                    batch = list(islice(chunk_iter, self.batch_size))
+                    if not batch:
+                        exhausted = True
+                        break
+                    texts = [chunk.page_content for chunk in batch]
+                    in_flight[pool.submit(self._embed_with_retry, texts)] = batch
+                if not in_flight:
+                    break
+
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    batch = in_flight.pop(future)
+                    vectors = future.result()
+                    ids.extend(self._write_batch(batch, vectors))
+                    if batch_callback:
+                        batch_callback(batch)
+                    done += len(batch)
+                    report(done, max(total, done))
+        return ids
+
+    def _embed_with_retry(self, texts: List[str]) -> List[List[float]]:
+        attempt = 0
+        while True:
+            try:
+                return self.embeddings.embed_documents(texts)
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt >= self.max_retries:
+                    raise
+                delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+                delay = delay * (0.5 + random.random() / 2)
+                print(f"DEBUG: Embedding rate limited, retrying in {delay:.1f}s (attempt {attempt + 1})")
+                time.sleep(delay)
+                attempt += 1
+
+    def _write_batch(self, batch: List[Document], vectors: List[List[float]]) -> List[str]:
+        ids = [chunk.id or str(uuid.uuid4()) for chunk in batch]
+        # Writes stay on the calling thread; Chroma sees one writer per pipeline
+        self.vector_store._collection.upsert(
+            ids=ids,
+            embeddings=vectors,
+            metadatas=[chunk.metadata or None for chunk in batch],
+            documents=[chunk.page_content for chunk in batch],
+        )
+        return ids
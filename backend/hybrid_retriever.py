@@ -0,0 +1,64 @@
+from typing import Any, List, Optional, Tuple
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from backend.keyword_index import reciprocal_rank_fusion
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Dense Chroma search and BM25 keyword search (KeywordIndex) merged by
+    reciprocal rank fusion. Dense embeddings match paraphrases; the keyword
+    side catches exact course codes, unit and clause numbers.
+    """
+
+    vector_store: Any
+    keyword_index: Any
+    k: int = 5
+    # Candidates taken from each side before fusion
+    fetch_k: int = 20
+    rrf_k: int = 60
+    filter: Optional[dict] = None
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        vector = self.vector_store.embeddings.embed_query(query)
+        docs, _, _ = self.search(query, vector, where=self.filter)
+        return docs
+
+    def search(
+        self, query: str, vector: List[float], where: Optional[dict] = None, k: Optional[int] = None
+    ) -> Tuple[List[Document], Optional[float], bool]:
+        """
+        Returns (fused documents, best dense L2 distance or None, whether the
+        top keyword hit contains every identifier named in the query).
+        """
+        k = k or self.k
+        collection = self.vector_store._collection
+        dense = collection.query(
+            query_embeddings=[vector],
+            n_results=self.fetch_k,
+            where=where,
+            include=["documents", "metadatas", "distances"],
+        )
+        dense_ids = dense["ids"][0]
+        docs_by_id = {
+            chunk: Document(page_content=text, metadata=metadata or {}, id=chunk)
+            for chunk, text, metadata in zip(dense_ids, dense["documents"][0], dense["metadatas"][0])
+        }
+        distances = dense["distances"][0]
+
+        keyword_hits = self.keyword_index.search(query, k=self.fetch_k, where=where)
+        fused = reciprocal_rank_fusion([dense_ids, [chunk for chunk, _ in keyword_hits]], k=self.rrf_k)[:k]
+
+        # Keyword-only hits are fetched from Chroma in one call
+        missing = [chunk for chunk in fused if chunk not in docs_by_id]
+        if missing:
+            found = collection.get(ids=missing, include=["documents", "metadatas"])
+            for chunk, text, metadata in zip(found["ids"], found["documents"], found["metadatas"]):
+                docs_by_id[chunk] = Document(page_content=text, metadata=metadata or {}, id=chunk)
+
+        keyword_match = bool(keyword_hits) and self.keyword_index.is_strong_match(query, keyword_hits[0][0])
+        docs = [docs_by_id[chunk] for chunk in fused if chunk in docs_by_id]
+        return docs, (distances[0] if distances else None), keyword_match
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+def file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_id(source: str, page, text: str, occurrence: int = 0) -> str:
+    """
+    Deterministic chunk id, so re-indexing the same content yields the same
+    ids. Only the source, page and text are hashed: loader metadata such as
+    total_pages or moddate changes on re-export without the chunk changing.
+    """
+    return hashlib.sha256(f"{source}\x00{page}\x00{text}\x00{occurrence}".encode("utf-8")).hexdigest()
+
+
+class IndexManifest:
+    """
+    Tracks, per indexed source file, its content hash, upload metadata and the
+    chunk ids written to Chroma. Lets re-indexing skip unchanged files and
+    delete only stale chunks from changed ones.
+
+    One SQLite row per source (WAL mode), read on every call, so workers
+    ingesting different files never overwrite each other's entries. Entries
+    from the older JSON manifest next to it are imported once.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS sources (
+                source TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL,
+                metadata TEXT NOT NULL,
+                chunk_ids TEXT NOT NULL,
+                indexed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.commit()
+        self._migrate_from_json(self.path.with_suffix(".json"))
+
+    def _migrate_from_json(self, legacy_file: Path):
+        with self._lock:
+            done = self._conn.execute("SELECT value FROM meta WHERE key = 'migrated_manifest_json'").fetchone()
+            if done or not legacy_file.exists():
+                return
+            try:
+                with open(legacy_file, "r") as f:
+                    entries = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                # Nothing is lost: untracked files are simply re-indexed in full
+                print(f"DEBUG ERROR: Could not import {legacy_file}: {e}")
+                entries = {}
+            with self._conn:
+                # INSERT OR IGNORE keeps it idempotent if another worker migrates at the same time
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO sources (source, sha256, metadata, chunk_ids, indexed_at) VALUES (?, ?, ?, ?, ?)",
+                    [(source, entry["sha256"], json.dumps(entry["metadata"]), json.dumps(entry["chunk_ids"]),
+                      entry.get("indexed_at", time.time())) for source, entry in entries.items()],
+                )
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_manifest_json', ?)",
+                                   (str(len(entries)),))
+            print(f"DEBUG: Migrated {len(entries)} manifest entries from {legacy_file} to {self.path}")
+
+    def get(self, source: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT sha256, metadata, chunk_ids, indexed_at FROM sources WHERE source = ?", (source,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"sha256": row[0], "metadata": json.loads(row[1]), "chunk_ids": json.loads(row[2]), "indexed_at": row[3]}
+
+    def sources(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT source FROM sources")]
+
+    def metadata(self) -> Dict[str, dict]:
+        """Upload metadata per source, e.g. to re-apply it when rebuilding the index."""
+        with self._lock:
+            return {source: json.loads(metadata) for source, metadata in self._conn.execute("SELECT source, metadata FROM sources")}
+
+    def set(self, source: str, file_hash: str, metadata: dict, chunk_ids: List[str]):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sources (source, sha256, metadata, chunk_ids, indexed_at) VALUES (?, ?, ?, ?, ?)",
+                (source, file_hash, json.dumps(metadata), json.dumps(chunk_ids), time.time()),
+            )
+
+    def remove(self, source: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sources WHERE source = ?", (source,))
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sources")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
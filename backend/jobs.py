@@ -0,0 +1,161 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+JOBS_DB = Path("data/jobs.db")
+
+# Job stages, in order
+STAGE_QUEUED = "queued"
+STAGE_LOADING = "loading"
+STAGE_EMBEDDING = "embedding"
+STAGE_SUMMARIZING = "summarizing"
+STAGE_DONE = "done"
+STAGE_FAILED = "failed"
+
+
+class IngestionJobQueue:
+    """
+    Runs document ingestion (load, split, embed, summarize) on a bounded
+    worker pool so /api/upload can return immediately. Jobs are persisted in
+    a SQLite table, so status survives restarts and is visible to every
+    uvicorn worker.
+    """
+
+    def __init__(self, rag_service, db_path: Path = JOBS_DB, max_workers: Optional[int] = None):
+        self.rag_service = rag_service
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.stale_after = int(os.getenv("INGEST_STALE_SECONDS", "600"))
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                file_path TEXT NOT NULL,
+                source TEXT,
+                department TEXT,
+                semester TEXT,
+                stage TEXT NOT NULL,
+                chunks_total INTEGER DEFAULT 0,
+                chunks_embedded INTEGER DEFAULT 0,
+                summary TEXT,
+                error TEXT,
+                created_at REAL,
+                started_at REAL,
+                embedding_started_at REAL,
+                updated_at REAL,
+                finished_at REAL
+            )
+        """)
+        self._conn.commit()
+
+        workers = max_workers or int(os.getenv("INGEST_WORKERS", "2"))
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest")
+        self._recover()
+
+    def enqueue(self, file_path: str, metadata: dict) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, file_path, source, department, semester, stage, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, file_path, metadata.get("source"), metadata.get("department"),
+                 metadata.get("semester"), STAGE_QUEUED, now, now),
+            )
+            self._conn.commit()
+        self.executor.submit(self._run, job_id)
+        return job_id
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["eta_seconds"] = self._estimate_eta(job)
+        return job
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _estimate_eta(self, job: dict) -> Optional[float]:
+        if job["stage"] != STAGE_EMBEDDING or not job["embedding_started_at"]:
+            return None
+        done, total = job["chunks_embedded"], job["chunks_total"]
+        elapsed = time.time() - job["embedding_started_at"]
+        if done <= 0 or elapsed <= 0:
+            return None
+        return round((total - done) / (done / elapsed), 1)
+
+    def _update(self, job_id: str, **fields):
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+            self._conn.commit()
+
+    def _claim(self, job_id: str) -> Optional[dict]:
+        # Only one worker (thread or process) may move a job out of "queued"
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET stage = ?, started_at = ?, updated_at = ? WHERE id = ? AND stage = ?",
+                (STAGE_LOADING, now, now, job_id, STAGE_QUEUED),
+            )
+            self._conn.commit()
+            if cursor.rowcount != 1:
+                return None
+            return dict(self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def _run(self, job_id: str):
+        job = self._claim(job_id)
+        if job is None:
+            return
+        metadata = {
+            "source": job["source"],
+            "department": job["department"],
+            "semester": job["semester"],
+        }
+
+        def on_progress(stage, done=0, total=0):
+            if stage == STAGE_EMBEDDING and done == 0:
+                self._update(job_id, stage=stage, chunks_total=total, chunks_embedded=0,
+                             embedding_started_at=time.time())
+            else:
+                self._update(job_id, stage=stage, chunks_total=total, chunks_embedded=done)
+
+        try:
+            success = self.rag_service.process_document(job["file_path"], metadata, progress_callback=on_progress)
+            if not success:
+                self._update(job_id, stage=STAGE_FAILED, error="Failed to process document", finished_at=time.time())
+                return
+            self._update(job_id, stage=STAGE_SUMMARIZING)
+            summary = self.rag_service.generate_summary(job["file_path"])
+            self._update(job_id, stage=STAGE_DONE, summary=summary, finished_at=time.time())
+        except Exception as e:
+            print(f"Error running ingestion job {job_id}: {e}")
+            self._update(job_id, stage=STAGE_FAILED, error=str(e), finished_at=time.time())
+
+    def _recover(self):
+        """Re-submits queued jobs and fails jobs whose worker died mid-run."""
+        cutoff = time.time() - self.stale_after
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET stage = ?, error = ?, finished_at = ? "
+                "WHERE stage IN (?, ?, ?) AND updated_at < ?",
+                (STAGE_FAILED, "Interrupted by server restart", time.time(),
+                 STAGE_LOADING, STAGE_EMBEDDING, STAGE_SUMMARIZING, cutoff),
+            )
+            self._conn.commit()
+            queued = [row["id"] for row in self._conn.execute("SELECT id FROM jobs WHERE stage = ?", (STAGE_QUEUED,))]
+        for job_id in queued:
+            self.executor.submit(self._run, job_id)
@@ -0,0 +1,495 @@
+import json
+import math
+import re
+import sqlite3
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Words too common in course documents to help keyword matching
+STOPWORDS = frozenset(
+    "a an and are as at be by for from how i in is it me of on or the this to was what when where which who why with".split()
+)
+# Metadata fields kept per chunk, for where-filters and delete-by-source
+INDEXED_FIELDS = ("source", "department", "semester")
+# Terms in nearly every chunk (idf below this) barely change the ranking but
+# touch every posting; they are only scored when the query has nothing else
+MIN_IDF = 0.1
+# Term-frequency weights are recomputed when the average chunk length drifts this much
+AVERAGE_LENGTH_DRIFT = 0.1
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:[.\-/_][a-z0-9]+)*")
+# Splits compounds at separators and letter/digit boundaries: "cs-301" -> cs, 301
+_PARTS = re.compile(r"[.\-/_]|(?<=[a-z])(?=[0-9])|(?<=[0-9])(?=[a-z])")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased terms. Identifiers like "CS-301" or "4.2.1" are kept whole;
+    letter/digit codes are also split into parts and joined ("cs-301" ->
+    cs-301, cs301, cs, 301), so "CS301", "CS-301" and "cs 301" share terms.
+    """
+    terms = []
+    for token in _TOKEN.findall(text.lower()):
+        # Plain words and numbers are the common case: no splitting needed
+        if token.isalpha():
+            if token not in STOPWORDS:
+                terms.append(token)
+            continue
+        if token.isdigit():
+            terms.append(token)
+            continue
+        terms.append(token)
+        parts = [part for part in _PARTS.split(token) if part]
+        if all(part.isdigit() for part in parts):
+            # Clause numbers like 4.2.1: "4", "2" and "1" on their own would match everything
+            continue
+        joined = "".join(parts)
+        if joined != token:
+            terms.append(joined)
+        terms.extend(part for part in parts if part not in STOPWORDS)
+    return terms
+
+
+def is_identifier(term: str) -> bool:
+    """Course codes, clause numbers and the like: mixes letters and digits, or dotted/hyphenated numbers."""
+    has_digit = any(c.isdigit() for c in term)
+    return has_digit and (any(c.isalpha() for c in term) or bool(_PARTS.search(term)))
+
+
+def filter_conditions(where: Optional[dict]) -> List[Tuple[str, str]]:
+    """(field, value) equality pairs of the Chroma-style filters built by RAGService._build_filter."""
+    if not where:
+        return []
+    if "$and" in where:
+        return [pair for condition in where["$and"] for pair in filter_conditions(condition)]
+    return list(where.items())
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[str]], k: int = 60) -> List[str]:
+    """Merges ranked id lists: each id scores sum(1 / (k + rank)) over the lists it appears in."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class _Postings:
+    """
+    One term's postings as growable arrays: chunk positions, counts and BM25
+    term-frequency weights. New entries are buffered in a list and folded
+    into the arrays in bulk, so adding a chunk costs no NumPy calls per term.
+    """
+
+    __slots__ = ("positions", "counts", "tf", "size", "live", "pending_positions", "pending_counts", "pending_tf")
+
+    FOLD_AT = 64
+
+    def __init__(self):
+        self.positions = np.empty(0, dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.float32)
+        self.tf = np.empty(0, dtype=np.float32)
+        self.size = 0
+        # Entries whose chunk is still indexed; removed chunks are skipped at query time
+        self.live = 0
+        self.pending_positions: List[int] = []
+        self.pending_counts: List[int] = []
+        self.pending_tf: List[float] = []
+
+    def append(self, pos: int, count: int, tf: float):
+        self.pending_positions.append(pos)
+        self.pending_counts.append(count)
+        self.pending_tf.append(tf)
+        self.live += 1
+        if len(self.pending_positions) >= self.FOLD_AT:
+            self.fold()
+
+    def fold(self):
+        if not self.pending_positions:
+            return
+        end = self.size + len(self.pending_positions)
+        if end > len(self.positions):
+            capacity = max(end, 2 * len(self.positions))
+            self.positions = np.resize(self.positions, capacity)
+            self.counts = np.resize(self.counts, capacity)
+            self.tf = np.resize(self.tf, capacity)
+        self.positions[self.size:end] = self.pending_positions
+        self.counts[self.size:end] = self.pending_counts
+        self.tf[self.size:end] = self.pending_tf
+        self.size = end
+        self.pending_positions, self.pending_counts, self.pending_tf = [], [], []
+
+    def compact(self, alive: np.ndarray):
+        self.fold()
+        keep = alive[self.positions[:self.size]]
+        self.positions = self.positions[:self.size][keep]
+        self.counts = self.counts[:self.size][keep]
+        self.tf = self.tf[:self.size][keep]
+        self.size = self.live = len(self.positions)
+
+
+class KeywordIndex:
+    """
+    In-memory BM25 inverted index over chunk text, keyed by the same chunk
+    ids as Chroma. Each term's postings are NumPy arrays with the
+    term-frequency part of the BM25 weight precomputed and appended to as
+    chunks arrive, so scoring a query is one vectorized add per term and an
+    ingest does not invalidate anything.
+
+    When a path is given, chunks are stored in a SQLite file (WAL mode) that
+    all workers share. Every upsert or deletion gets a new row sequence
+    number; each worker applies the rows it has not seen before every
+    search and inside the write transaction of every change, so concurrent
+    ingestions in different workers never overwrite each other.
+    """
+
+    K1 = 1.5
+    B = 0.75
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else None
+        self._lock = threading.RLock()
+        self._reset()
+        self._conn = None
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            # counts is NULL for a deleted chunk (kept so other workers see the deletion)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS chunks (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    chunk_id TEXT UNIQUE NOT NULL,
+                    counts TEXT,
+                    metadata TEXT
+                )
+            """)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            self._conn.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('generation', 0)")
+            # Rows from an earlier build stored pickled counts; never unpickle them, rebuild instead
+            if self._conn.execute("DELETE FROM chunks WHERE typeof(counts) = 'blob'").rowcount:
+                self._conn.execute("UPDATE meta SET value = value + 1 WHERE name = 'generation'")
+            self._data_version = None
+            self._generation = None
+            self._last_seq = 0
+            with self._lock:
+                self._sync()
+
+    def _reset(self):
+        self._ids: List[Optional[str]] = []
+        self._positions: Dict[str, int] = {}
+        self._term_counts: List[Optional[Dict[str, int]]] = []
+        self._metadata: List[Optional[dict]] = []
+        self._postings: Dict[str, _Postings] = {}
+        self._by_source: Dict[str, set] = {}
+        self._total_length = 0
+        self._dead = 0
+        # Per-position arrays, grown by doubling
+        self._lengths = np.zeros(0, dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._scores = np.zeros(0, dtype=np.float32)  # scratch buffer, all zero between searches
+        # Filter fields as integer codes per position (-1: not set)
+        self._codes = {field: np.zeros(0, dtype=np.int32) for field in INDEXED_FIELDS}
+        self._code_of: Dict[str, Dict[str, int]] = {field: {} for field in INDEXED_FIELDS}
+        # Average chunk length the stored tf weights were computed with
+        self._tf_average: Optional[float] = None
+
+    def __len__(self):
+        with self._lock:
+            self._sync()
+            return len(self._positions)
+
+    # Persistence
+
+    def _sync(self):
+        """Applies rows other workers wrote since the last sync. Call with self._lock held."""
+        if self._conn is None:
+            return
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version:
+            return
+        self._data_version = data_version
+
+        generation = self._conn.execute("SELECT value FROM meta WHERE name = 'generation'").fetchone()[0]
+        if generation != self._generation:
+            # Cleared or pruned by another worker: reload from scratch
+            self._reset()
+            self._generation = generation
+            self._last_seq = 0
+
+        rows = self._conn.execute(
+            "SELECT seq, chunk_id, counts, metadata FROM chunks WHERE seq > ? ORDER BY seq", (self._last_seq,)
+        ).fetchall()
+        if not rows:
+            return
+        removed, added = [], {}
+        for seq, chunk, counts, metadata in rows:
+            removed.append(chunk)
+            added.pop(chunk, None)
+            if counts is not None:
+                added[chunk] = (json.loads(counts), json.loads(metadata))
+        self._remove_ids(removed)
+        self._add_entries([(chunk, counts, metadata) for chunk, (counts, metadata) in added.items()])
+        self._last_seq = rows[-1][0]
+
+    @contextmanager
+    def _write(self):
+        """One write transaction: catches up on other workers' rows first, so local state is current."""
+        with self._lock:
+            if self._conn is None:
+                yield
+                return
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._sync()
+                yield
+                self._last_seq = self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM chunks").fetchone()[0]
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                # Local state may hold the failed change; rebuild it from the file
+                self._reset()
+                self._generation = self._data_version = None
+                self._last_seq = 0
+                self._sync()
+                raise
+
+    def save(self):
+        """
+        Changes are written as they happen; this compacts: positions of
+        removed chunks once they outnumber live ones, and deletion markers in
+        the file (which makes other workers reload once).
+        """
+        with self._lock:
+            if self._dead > max(len(self._positions), 1000):
+                self._compact()
+            if self._conn is None:
+                return
+            with self._write():
+                deleted = self._conn.execute("SELECT COUNT(*) FROM chunks WHERE counts IS NULL").fetchone()[0]
+                if deleted > max(4 * len(self._positions), 10000):
+                    self._conn.execute("DELETE FROM chunks WHERE counts IS NULL")
+                    self._generation = self._conn.execute(
+                        "UPDATE meta SET value = value + 1 WHERE name = 'generation' RETURNING value"
+                    ).fetchone()[0]
+
+    def clear(self):
+        with self._write():
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM chunks")
+                self._generation = self._conn.execute(
+                    "UPDATE meta SET value = value + 1 WHERE name = 'generation' RETURNING value"
+                ).fetchone()[0]
+            self._reset()
+
+    def _compact(self):
+        live = [(self._ids[pos], self._term_counts[pos], self._metadata[pos]) for pos in self._positions.values()]
+        self._reset()
+        self._add_entries(live)
+
+    # Updates
+
+    def add(self, ids: List[str], texts: List[str], metadatas: Optional[List[Optional[dict]]] = None):
+        metadatas = metadatas or [None] * len(ids)
+        entries = {}
+        for chunk, text, metadata in zip(ids, texts, metadatas):
+            kept = {field: metadata[field] for field in INDEXED_FIELDS if metadata and field in metadata}
+            entries[chunk] = (dict(Counter(tokenize(text))), kept)
+        with self._write():
+            if self._conn is not None:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO chunks (chunk_id, counts, metadata) VALUES (?, ?, ?)",
+                    [(chunk, json.dumps(counts), json.dumps(kept))
+                     for chunk, (counts, kept) in entries.items()],
+                )
+            self._remove_ids(entries)
+            self._add_entries([(chunk, counts, kept) for chunk, (counts, kept) in entries.items()])
+
+    def add_documents(self, documents) -> None:
+        self.add([doc.id for doc in documents], [doc.page_content for doc in documents],
+                 [doc.metadata for doc in documents])
+
+    def remove(self, ids: Iterable[str]):
+        ids = list(ids)
+        with self._write():
+            self._delete_rows(ids)
+            self._remove_ids(ids)
+
+    def remove_source(self, source: str):
+        with self._write():
+            ids = [self._ids[pos] for pos in self._by_source.get(source, ())]
+            self._delete_rows(ids)
+            self._remove_ids(ids)
+
+    def _delete_rows(self, ids: List[str]):
+        if self._conn is not None and ids:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (chunk_id, counts, metadata) VALUES (?, NULL, NULL)",
+                [(chunk,) for chunk in ids],
+            )
+
+    def _grow(self, size: int):
+        if size <= len(self._lengths):
+            return
+        capacity = max(size, 2 * len(self._lengths), 1024)
+        self._lengths = np.concatenate([self._lengths, np.zeros(capacity - len(self._lengths), dtype=np.float32)])
+        self._alive = np.concatenate([self._alive, np.zeros(capacity - len(self._alive), dtype=bool)])
+        self._scores = np.zeros(capacity, dtype=np.float32)
+        for field, codes in self._codes.items():
+            self._codes[field] = np.concatenate([codes, np.full(capacity - len(codes), -1, dtype=np.int32)])
+
+    def _add_entries(self, entries: List[Tuple[str, Dict[str, int], dict]]):
+        """Indexes (chunk id, term counts, metadata) for chunks not currently indexed."""
+        if not entries:
+            return
+        first = len(self._ids)
+        self._grow(first + len(entries))
+        for offset, (chunk, counts, metadata) in enumerate(entries):
+            pos = first + offset
+            self._ids.append(chunk)
+            self._positions[chunk] = pos
+            self._term_counts.append(counts)
+            self._metadata.append(metadata)
+            length = sum(counts.values())
+            self._lengths[pos] = length
+            self._alive[pos] = True
+            self._total_length += length
+            for field, value in metadata.items():
+                code = self._code_of[field].setdefault(value, len(self._code_of[field]))
+                self._codes[field][pos] = code
+            self._by_source.setdefault(metadata.get("source"), set()).add(pos)
+
+        average = self._average_length()
+        if self._tf_average is None or abs(average - self._tf_average) > AVERAGE_LENGTH_DRIFT * self._tf_average:
+            self._recompute_tf(average)
+        k1_plus_1 = self.K1 + 1
+        for offset, (_, counts, _) in enumerate(entries):
+            pos = first + offset
+            norm = self.K1 * (1 - self.B + self.B * float(self._lengths[pos]) / self._tf_average)
+            for term, count in counts.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    self._postings[term] = postings = _Postings()
+                postings.append(pos, count, count * k1_plus_1 / (count + norm))
+
+    def _remove_ids(self, ids: Iterable[str]):
+        for chunk in ids:
+            pos = self._positions.pop(chunk, None)
+            if pos is not None:
+                self._remove_position(pos)
+
+    def _remove_position(self, pos: int):
+        for term in self._term_counts[pos]:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.live -= 1
+            if postings.live == 0:
+                del self._postings[term]
+            elif postings.size > 64 and postings.live < postings.size // 2:
+                self._alive[pos] = False
+                postings.compact(self._alive)
+        positions = self._by_source.get(self._metadata[pos].get("source"))
+        if positions is not None:
+            positions.discard(pos)
+        self._total_length -= int(self._lengths[pos])
+        self._lengths[pos] = 0
+        self._alive[pos] = False
+        for codes in self._codes.values():
+            codes[pos] = -1
+        self._ids[pos] = None
+        self._term_counts[pos] = None
+        self._metadata[pos] = None
+        self._dead += 1
+
+    def _average_length(self) -> float:
+        return max(self._total_length / max(len(self._positions), 1), 1.0)
+
+    def _tf(self, counts: np.ndarray, positions: np.ndarray) -> np.ndarray:
+        norms = self.K1 * (1 - self.B + self.B * self._lengths[positions] / self._tf_average)
+        return counts * (self.K1 + 1) / (counts + norms)
+
+    def _recompute_tf(self, average: float):
+        self._tf_average = average
+        for postings in self._postings.values():
+            postings.fold()
+            size = postings.size
+            postings.tf[:size] = self._tf(postings.counts[:size], postings.positions[:size])
+
+    # Queries
+
+    def search(self, query: str, k: int = 5, where: Optional[dict] = None) -> List[Tuple[str, float]]:
+        """Top-k (chunk id, BM25 score) for the query, restricted to chunks matching where."""
+        terms = set(tokenize(query))
+        with self._lock:
+            self._sync()
+            live = len(self._positions)
+            if not terms or not live:
+                return []
+            weighted = []
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.fold()
+                    idf = math.log(1 + (live - postings.live + 0.5) / (postings.live + 0.5))
+                    weighted.append((idf, postings))
+            if any(idf >= MIN_IDF for idf, _ in weighted):
+                weighted = [(idf, postings) for idf, postings in weighted if idf >= MIN_IDF]
+
+            scores = self._scores
+            touched = []
+            for idf, postings in weighted:
+                positions = postings.positions[:postings.size]
+                scores[positions] += idf * postings.tf[:postings.size]
+                touched.append(positions)
+            if not touched:
+                return []
+            if len(touched) == 1:
+                candidates = touched[0]
+            else:
+                # Sort-based dedupe; much faster than np.unique's hashing for these sizes
+                candidates = np.sort(np.concatenate(touched))
+                candidates = candidates[np.concatenate(([True], candidates[1:] != candidates[:-1]))]
+            top = scores[candidates]
+            # Reset the scratch buffer for the next search
+            scores[candidates] = 0
+
+            keep = self._alive[candidates]
+            for field, value in filter_conditions(where):
+                code = self._code_of.get(field, {}).get(value)
+                if code is None:
+                    return []
+                keep &= self._codes[field][candidates] == code
+            candidates, top = candidates[keep], top[keep]
+
+            if len(candidates) > k:
+                best = np.argpartition(-top, k)[:k]
+                candidates, top = candidates[best], top[best]
+            order = np.argsort(-top, kind="stable")
+            return [(self._ids[pos], float(top[i])) for i, pos in zip(order, candidates[order])]
+
+    def is_strong_match(self, query: str, chunk: str) -> bool:
+        """True when the query names identifiers (e.g. "CS301", "4.2.1") and the chunk contains all of them."""
+        identifiers = {term for term in tokenize(query) if is_identifier(term)}
+        if not identifiers:
+            return False
+        with self._lock:
+            pos = self._positions.get(chunk)
+            if pos is None:
+                return False
+            return identifiers.issubset(self._term_counts[pos])
+
+    @classmethod
+    def from_vector_store(cls, vector_store, path: Optional[Path] = None) -> "KeywordIndex":
+        """Builds (or rebuilds) the index from every chunk already stored in a Chroma vector store."""
+        index = cls(path)
+        data = vector_store.get(include=["documents", "metadatas"])
+        index.clear()
+        index.add(data["ids"], data["documents"], data["metadatas"])
+        return index
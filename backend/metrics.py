@@ -0,0 +1,162 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Iterable, Optional
+
+METRICS_DB = Path("data/metrics.db")
+LEGACY_STATS_FILE = Path("data/stats.json")
+
+# Per-minute rows older than this are pruned on flush
+MINUTE_RETENTION_SECONDS = 2 * 24 * 3600
+
+# Departments offered in the admin dashboard; METRICS_DEPARTMENTS overrides (comma-separated)
+DEFAULT_DEPARTMENTS = "Computer Science,Electronics,Mechanical,Civil,MBA"
+OTHER_DEPARTMENT = "other"
+
+
+class MetricsStore:
+    """
+    In-memory counters for the chat hot path. Increments only touch a dict
+    under a lock; a background thread periodically adds the accumulated
+    deltas to SQLite. Deltas are applied additively, so several uvicorn
+    workers can flush into the same file without losing counts.
+    """
+
+    def __init__(self, db_path: Path = METRICS_DB, flush_interval: Optional[float] = None,
+                 legacy_stats_file: Path = LEGACY_STATS_FILE, departments: Optional[Iterable[str]] = None):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.flush_interval = flush_interval or float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+        if departments is None:
+            departments = os.getenv("METRICS_DEPARTMENTS", DEFAULT_DEPARTMENTS).split(",")
+        # Lowercased name -> display name
+        self._departments = {name.strip().lower(): name.strip() for name in departments if name.strip()}
+
+        self._lock = threading.Lock()
+        self._counters = Counter()
+        self._minutes = Counter()  # (minute_epoch, name) -> count
+
+        self._db_lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS minute_counts (
+                minute INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                value INTEGER NOT NULL,
+                PRIMARY KEY (minute, name)
+            )
+        """)
+        self._seed_from_legacy(Path(legacy_stats_file))
+        self._conn.commit()
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _seed_from_legacy(self, stats_file: Path):
+        # One-time import of the old stats.json totals; INSERT OR IGNORE keeps it idempotent
+        try:
+            with open(stats_file, "r") as f:
+                legacy = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            legacy = {"total_queries": 0, "unique_students": 12}  # Start with base mock for students
+        self._conn.execute("INSERT OR IGNORE INTO counters (name, value) VALUES ('queries', ?)",
+                           (int(legacy.get("total_queries", 0)),))
+        self._conn.execute("INSERT OR IGNORE INTO counters (name, value) VALUES ('unique_students', ?)",
+                           (int(legacy.get("unique_students", 0)),))
+
+    def incr(self, name: str, amount: int = 1):
+        minute = int(time.time() // 60) * 60
+        with self._lock:
+            self._counters[name] += amount
+            self._minutes[(minute, name)] += amount
+
+    def record_query(self, department: Optional[str] = None):
+        self.incr("queries")
+        if department:
+            # The department comes from the request body; unknown values share one
+            # counter so arbitrary strings cannot grow the counters table
+            self.incr(f"department:{self._departments.get(department.strip().lower(), OTHER_DEPARTMENT)}")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="metrics-flush", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error flushing metrics: {e}")
+
+    def flush(self):
+        with self._lock:
+            counters, self._counters = self._counters, Counter()
+            minutes, self._minutes = self._minutes, Counter()
+        if not counters and not minutes:
+            return
+        try:
+            self._write(counters, minutes)
+        except Exception:
+            # Keep the deltas for the next flush rather than dropping them
+            with self._lock:
+                self._counters.update(counters)
+                self._minutes.update(minutes)
+            raise
+
+    def _write(self, counters: Counter, minutes: Counter):
+        with self._db_lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO counters (name, value) VALUES (?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                    list(counters.items()),
+                )
+                self._conn.executemany(
+                    "INSERT INTO minute_counts (minute, name, value) VALUES (?, ?, ?) "
+                    "ON CONFLICT(minute, name) DO UPDATE SET value = value + excluded.value",
+                    [(minute, name, value) for (minute, name), value in minutes.items()],
+                )
+                self._conn.execute("DELETE FROM minute_counts WHERE minute < ?",
+                                   (int(time.time()) - MINUTE_RETENTION_SECONDS,))
+
+    def snapshot(self, window_minutes: int = 60) -> dict:
+        """Flushed totals plus this worker's pending deltas."""
+        now_minute = int(time.time() // 60) * 60
+        window_start = now_minute - (window_minutes - 1) * 60
+        local_time = time.localtime()
+        day_start = int(time.time() - (local_time.tm_hour * 3600 + local_time.tm_min * 60 + local_time.tm_sec))
+
+        with self._db_lock:
+            counters = Counter(dict(self._conn.execute("SELECT name, value FROM counters").fetchall()))
+            minute_rows = self._conn.execute(
+                "SELECT minute, value FROM minute_counts WHERE name = 'queries' AND minute >= ?",
+                (min(window_start, day_start),),
+            ).fetchall()
+        with self._lock:
+            counters.update(self._counters)
+            pending = [(minute, value) for (minute, name), value in self._minutes.items() if name == "queries"]
+
+        per_minute = Counter()
+        for minute, value in minute_rows + pending:
+            per_minute[minute] += value
+
+        return {
+            "counters": {name: value for name, value in counters.items() if not name.startswith("department:")},
+            "departments": {name.split(":", 1)[1]: value for name, value in counters.items() if name.startswith("department:")},
+            "queries_today": sum(value for minute, value in per_minute.items() if minute >= day_start),
+            "queries_per_minute": [
+                {"minute": minute, "count": per_minute.get(minute, 0)}
+                for minute in range(window_start, now_minute + 60, 60)
+            ],
+        }
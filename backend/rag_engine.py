@@ -1,6 +1,13 @@
+import asyncio
+import functools
 import json
+import string
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
-from typing import List, Tuple
+from typing import AsyncIterator, List, Optional, Tuple
 
 # Langchain imports
 from langchain_community.document_loaders import (
@@ -11,26 +18,120 @@ from langchain_community.document_loaders import (
     Docx2txtLoader,
 )
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import Chroma
-from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_classic.chains import ConversationalRetrievalChain
-from langchain_classic.memory import ConversationBufferMemory
+# Provider-specific clients (Chroma, Google, OpenAI, sentence-transformers) are
+# imported inside their factory methods, so only the selected ones are loaded
 from langchain_core.prompts import PromptTemplate
+from langchain_core.output_parsers import StrOutputParser
 from langchain_core.documents import Document
 
+from backend.answer_cache import CACHE_SCOPE_SEPARATOR, create_answer_cache
+from backend.embedding_cache import CachedEmbeddings, EmbeddingCache
+from backend.embedding_pipeline import EmbeddingPipeline
+from backend.metrics import MetricsStore
+from backend.session_memory import SessionMemoryStore
+from backend.index_manifest import IndexManifest, chunk_id, file_sha256
+from backend.keyword_index import KeywordIndex
+from backend.context_packer import ContextPacker
+from backend.rate_limit import LLMQuotaGovernor, QuotaExceededError, is_rate_limit_error
+from backend.single_flight import SingleFlight
+
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
 
-import google.generativeai as genai
-# Configure global genai to use REST to avoid GRPC hangs
-genai.configure(transport="rest")
+@functools.lru_cache(maxsize=None)
+def _load_genai():
+    import google.generativeai as genai
+    # Configure global genai to use REST to avoid GRPC hangs
+    genai.configure(transport="rest")
+    return genai
+
+SUPPORTED_EXTENSIONS = [".pdf", ".docx", ".txt", ".csv"]
+
+# Chunks retrieved per academic question
+RETRIEVAL_K = 5
+# Top dense result closer than this (Chroma L2 distance) routes to the academic chain
+ACADEMIC_MAX_DISTANCE = 1.2
+
+ACADEMIC_PROMPT_TEMPLATE = """You are CollegeBot, an intelligent academic assistant.
+        
+        MODE: ACADEMIC_DOCUMENT_QUERY
+        
+        INSTRUCTIONS:
+        1. Context Usage: Priority is given to the provided Context.
+        2. Not Found: If the answer is NOT in the Context, you MAY use your own general knowledge to answer, but you MUST preface it with: "I could not find this specific information in the uploaded documents, but here is a general answer:".
+        3. Structure: Explain step-by-step. Use headings and bullet points.
+        4. Citations: If you use the Context, you MUST cite the document name and page number.
+           Format: [Source: filename (Page X)]
+        
+        Context: {context}
+        Chat History: {chat_history}
+        Question: {question}
+        
+        Answer:"""
+
+ACADEMIC_PROMPT = PromptTemplate(
+    input_variables=["context", "chat_history", "question"],
+    template=ACADEMIC_PROMPT_TEMPLATE
+)
+
+class _LazyComponent:
+    """
+    RAGService attribute built on first access by the named factory method.
+    Each component has its own lock, so independent components can be built
+    in parallel while a dependent one waits for its inputs. Assigning the
+    attribute directly (as the benchmarks do with stubs) skips the factory.
+    """
+
+    def __init__(self, factory: str):
+        self.factory = factory
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        value = obj.__dict__.get(self.name)
+        if value is not None:
+            return value
+        lock = obj.__dict__.setdefault(f"_{self.name}_lock", threading.Lock())
+        with lock:
+            if obj.__dict__.get(self.name) is None:
+                print(f"DEBUG: Initializing {self.name}", flush=True)
+                start = time.perf_counter()
+                obj.__dict__[self.name] = getattr(obj, self.factory)()
+                elapsed = time.perf_counter() - start
+                obj.__dict__.setdefault("init_timings", {})[self.name] = round(elapsed, 3)
+                print(f"DEBUG: {self.name} initialized in {elapsed:.2f}s", flush=True)
+        return obj.__dict__[self.name]
+
+    def __set__(self, obj, value):
+        obj.__dict__[self.name] = value
+
 
 class RAGService:
+    # Heavy components are built lazily (or all at once by warm_up)
+    embeddings = _LazyComponent("_get_embeddings")
+    vector_store = _LazyComponent("_get_vector_store")
+    llm = _LazyComponent("_get_llm") # Unified LLM instance for Chains
+    genai_model = _LazyComponent("_get_genai_model") # Direct model for robust operations
+    academic_chain = _LazyComponent("_create_academic_chain")
+    keyword_index = _LazyComponent("_get_keyword_index") # BM25 over the same chunks, kept in sync on ingest/delete
+    hybrid_retriever = _LazyComponent("_get_hybrid_retriever")
+    reranker = _LazyComponent("_get_reranker") # Only built when RERANKER=local
+    token_encoding = _LazyComponent("_load_token_encoding") # tiktoken file used by the context packer
+
+    # Components warm_up builds in parallel; each tuple is built in order
+    WARM_UP_GROUPS = [
+        ("embeddings", "vector_store", "keyword_index"),
+        ("llm", "academic_chain"),
+        ("genai_model",),
+        ("token_encoding",),
+    ]
+
     def __init__(self):
         self.tmp_dir = Path("data/tmp")
         self.vector_store_dir = Path("data/vector_stores/college_docs")
@@ -38,54 +139,206 @@ class RAGService:
         self.tmp_dir.mkdir(parents=True, exist_ok=True)
         self.vector_store_dir.parent.mkdir(parents=True, exist_ok=True)
         
-        self.stats_file = Path("data/stats.json")
         print("DEBUG: Starting RAGService initialization", flush=True)
-        self._init_stats_file()
-        print("DEBUG: Stats file initialized", flush=True)
+        # In-memory counters, flushed to data/metrics.db in the background
+        self.metrics = MetricsStore()
+        self.metrics.start()
+        print("DEBUG: Metrics store initialized", flush=True)
         
         
         # Configuration
         self.llm_provider = os.getenv("LLM_PROVIDER", "Google") # Google, OpenAI, HuggingFace
         self.google_api_key = os.getenv("GOOGLE_API_KEY")
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
+        self.embeddings_backend = os.getenv("EMBEDDINGS_BACKEND", "google").lower() # google, local
+        # Vectors from different models have different dimensions, so each backend gets its own collection
+        self.collection_name = "langchain" if self.embeddings_backend == "google" else f"college_docs_{self.embeddings_backend}"
+        # Per-file content hashes and chunk ids, for incremental re-indexing
+        manifest_name = "index_manifest.db" if self.collection_name == "langchain" else f"index_manifest_{self.collection_name}.db"
+        self.manifest = IndexManifest(self.vector_store_dir / manifest_name)
+        # vector: dense search only; hybrid: dense + BM25 keyword search fused by reciprocal rank
+        self.retriever_type = os.getenv("RETRIEVER_TYPE", "vector").lower()
+        # none, local: local cross-encoder picks the best RERANK_TOP_N of RERANK_FETCH_K retrieved chunks
+        self.reranker_type = os.getenv("RERANKER", "none").lower()
+        # Also store sub-chunk embeddings at ingest, for the contextual compression retriever (RAG_app)
+        self.index_subchunks = os.getenv("SUBCHUNK_INDEX", "false").lower() in ("1", "true", "yes")
+        self.retrieval_k = int(os.getenv("RERANK_FETCH_K", "16")) if self.reranker_type == "local" else RETRIEVAL_K
+        if self.reranker_type == "local":
+            # Fail at startup rather than on the first question
+            from backend.reranker import check_available
+            check_available()
+        # Bounded pool for blocking SDK calls made from the async chat path
+        self.executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("RAG_EXECUTOR_WORKERS", "32")),
+            thread_name_prefix="rag-blocking",
+        )
         
-        # Initialize components
-        print("DEBUG: Getting embeddings", flush=True)
-        self.embeddings = self._get_embeddings()
-        print("DEBUG: Embeddings initialized", flush=True)
-        print("DEBUG: Getting vector store", flush=True)
-        self.vector_store = self._get_vector_store()
-        print("DEBUG: Vector store initialized", flush=True)
-        self.llm = self._get_llm() # Unified LLM instance for Chains
-        print("DEBUG: LLM initialized", flush=True)
-        self.genai_model = genai.GenerativeModel("gemini-flash-latest") # Direct model for robust operations
-        print("DEBUG: GenAI model initialized", flush=True)
+        # Embeddings, vector store, LLM clients and chains are built on first use
+        # or by warm_up(); init_timings records seconds per component
+        self.init_timings = {}
+        self.startup_error = None
+        self._ready = threading.Event()
         
-        # Shared Memory
-        self.memory = ConversationBufferMemory(
-            memory_key="chat_history",
-            return_messages=True,
-            output_key="answer"
+        # Bounded exact + semantic answer cache (in-process or shared across workers)
+        self.answer_cache = create_answer_cache()
+
+        # Per-user conversation memory with bounded windows and idle eviction
+        summarize = os.getenv("MEMORY_SUMMARIZE", "false").lower() in ("1", "true", "yes")
+        # Summaries run on the executor so saving a turn never blocks the event loop
+        self.session_memory = SessionMemoryStore(
+            summarizer=self._summarize_turns if summarize else None,
+            executor=self.executor,
         )
-        
-        # Create Chains
-        self.academic_chain = self._create_academic_chain()
+        # Token budget for retrieved chunks + chat history in the academic prompt
+        self.context_packer = ContextPacker()
+        # Shared budget for LLM calls; adapts to upstream 429s and sheds load past LLM_QUEUE_TIMEOUT
+        self.llm_governor = LLMQuotaGovernor.from_env()
+        # Concurrent identical questions share one retrieval + LLM call, keyed like the answer
+        # cache (question + filters): an answer is reused across callers either way
+        self.single_flight = SingleFlight()
+
+    @property
+    def is_ready(self) -> bool:
+        if not self._ready.is_set():
+            # Components that failed during warm-up may since have been built on first use
+            if all(self.__dict__.get(name) is not None for group in self._warm_up_groups() for name in group):
+                self.startup_error = None
+                self._ready.set()
+        return self._ready.is_set()
+
+    def _warm_up_groups(self) -> List[Tuple[str, ...]]:
+        groups = list(self.WARM_UP_GROUPS)
+        if self.reranker_type == "local":
+            groups.append(("reranker",))
+        return groups
+
+    def warm_up(self, max_attempts: Optional[int] = None) -> dict:
+        """
+        Builds all lazy components, independent groups concurrently, and marks
+        the service ready. Failures are recorded in startup_error and retried
+        with exponential backoff (WARM_UP_ATTEMPTS, 0 = until it succeeds), so
+        a transient outage at boot does not leave /ready failing for good.
+        """
+        if max_attempts is None:
+            max_attempts = int(os.getenv("WARM_UP_ATTEMPTS", "0"))
+        delay = float(os.getenv("WARM_UP_RETRY_SECONDS", "2"))
+        start = time.perf_counter()
+        attempt = 0
+        while True:
+            attempt += 1
+            groups = self._warm_up_groups()
+            with ThreadPoolExecutor(max_workers=len(groups), thread_name_prefix="rag-warmup") as pool:
+                # Components built by an earlier attempt are cached and return immediately
+                futures = [pool.submit(self._build_components, group) for group in groups]
+                errors = [str(e) for e in (future.exception() for future in futures) if e is not None]
+            if not errors:
+                break
+            self.startup_error = "; ".join(errors)
+            if max_attempts and attempt >= max_attempts:
+                print(f"DEBUG ERROR: RAGService warm-up failed: {self.startup_error}", flush=True)
+                break
+            print(f"DEBUG ERROR: RAGService warm-up attempt {attempt} failed, retrying in {delay:g}s: {self.startup_error}", flush=True)
+            time.sleep(delay)
+            delay = min(delay * 2, 60.0)
+        self.init_timings["total"] = round(time.perf_counter() - start, 3)
+
+        if not errors:
+            self.startup_error = None
+            self._ready.set()
+            print(f"DEBUG: RAGService ready in {self.init_timings['total']:.2f}s", flush=True)
+        return dict(self.init_timings)
+
+    def _build_components(self, names):
+        for name in names:
+            getattr(self, name)
 
     def _get_embeddings(self):
+        embeddings, model_name = self._create_base_embeddings(self.embeddings_backend)
+        # Content-addressed cache: re-indexing unchanged chunks makes no API calls
+        return CachedEmbeddings(embeddings, EmbeddingCache(), model_name=model_name)
+
+    def _create_base_embeddings(self, backend: str):
+        """Returns (embeddings, model_name) for the given backend, without caching."""
+        if backend == "local":
+            return self._create_local_embeddings()
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
         # Using the verified correct model name for this account
-        return GoogleGenerativeAIEmbeddings(model="models/gemini-embedding-001", google_api_key=self.google_api_key, transport="rest")
+        embeddings = GoogleGenerativeAIEmbeddings(model="models/gemini-embedding-001", google_api_key=self.google_api_key, transport="rest")
+        return embeddings, embeddings.model
+
+    def _create_local_embeddings(self):
+        """
+        On-CPU sentence-transformers model: no network round trips and no
+        quota. LOCAL_EMBEDDINGS_ONNX=true runs it through onnxruntime.
+        """
+        model_name = os.getenv("LOCAL_EMBEDDINGS_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+        threads = os.getenv("LOCAL_EMBEDDINGS_THREADS")
+        use_onnx = os.getenv("LOCAL_EMBEDDINGS_ONNX", "false").lower() in ("1", "true", "yes")
+        if threads:
+            os.environ.setdefault("OMP_NUM_THREADS", threads)
+            try:
+                import torch
+                torch.set_num_threads(int(threads))
+            except ImportError:
+                pass
+
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        model_kwargs = {"device": "cpu"}
+        if use_onnx:
+            model_kwargs["backend"] = "onnx"
+        embeddings = HuggingFaceEmbeddings(
+            model_name=model_name,
+            model_kwargs=model_kwargs,
+            encode_kwargs={
+                "batch_size": int(os.getenv("LOCAL_EMBEDDINGS_BATCH_SIZE", "64")),
+                "normalize_embeddings": True,
+            },
+        )
+        return embeddings, f"local:{model_name}{':onnx' if use_onnx else ''}"
 
     def _get_vector_store(self):
         # Initialize Chroma
-        if self.vector_store_dir.exists() and any(self.vector_store_dir.iterdir()):
-             return Chroma(persist_directory=str(self.vector_store_dir), embedding_function=self.embeddings)
-        else:
-             return Chroma(persist_directory=str(self.vector_store_dir), embedding_function=self.embeddings)
+        from langchain_community.vectorstores import Chroma
+        return Chroma(
+            collection_name=self.collection_name,
+            persist_directory=str(self.vector_store_dir),
+            embedding_function=self.embeddings,
+        )
+
+    def _get_keyword_index(self):
+        name = "keyword_index.db" if self.collection_name == "langchain" else f"keyword_index_{self.collection_name}.db"
+        path = self.vector_store_dir / name
+        index = KeywordIndex(path)
+        if len(index) == 0 and self.manifest.sources():
+            # Documents indexed before the keyword index existed (or while it was a pickle file)
+            print("DEBUG: Building keyword index from the vector store", flush=True)
+            index = KeywordIndex.from_vector_store(self.vector_store, path)
+        return index
+
+    def _get_hybrid_retriever(self):
+        from backend.hybrid_retriever import HybridRetriever
+        return HybridRetriever(
+            vector_store=self.vector_store,
+            keyword_index=self.keyword_index,
+            k=self.retrieval_k,
+            fetch_k=max(int(os.getenv("HYBRID_FETCH_K", "20")), self.retrieval_k),
+        )
+
+    def _get_reranker(self):
+        from backend.reranker import LocalReranker
+        reranker = LocalReranker.from_env()
+        reranker.model # Load the cross-encoder now rather than on the first question
+        return reranker
+
+    def _load_token_encoding(self):
+        from backend.context_packer import load_encoding
+        return load_encoding()
 
     def _get_llm(self):
         print("DEBUG: Initializing LLM")
         # Reduced max_output_tokens to 150 for quota optimization
         if self.llm_provider == "Google":
+            from langchain_google_genai import ChatGoogleGenerativeAI
             return ChatGoogleGenerativeAI(
                 model="models/gemini-flash-latest",
                 google_api_key=self.google_api_key,
@@ -93,6 +346,7 @@ class RAGService:
                 max_output_tokens=1024, 
             )
         elif self.llm_provider == "OpenAI":
+            from langchain_openai import ChatOpenAI
             return ChatOpenAI(
                  model="gpt-3.5-turbo",
                  api_key=self.openai_api_key,
@@ -100,6 +354,7 @@ class RAGService:
                  max_tokens=512
             )
         else:
+            from langchain_google_genai import ChatGoogleGenerativeAI
             return ChatGoogleGenerativeAI(
                 model="models/gemini-flash-latest",
                 google_api_key=self.google_api_key,
@@ -108,40 +363,33 @@ class RAGService:
                 max_output_tokens=1024,
             )
 
+    def _get_genai_model(self):
+        return _load_genai().GenerativeModel("gemini-flash-latest")
+
     # [RESTORED METHOD]
     def _create_academic_chain(self):
-        retriever = self.vector_store.as_retriever(search_kwargs={"k": 5})
-        
-        template = """You are CollegeBot, an intelligent academic assistant.
-        
-        MODE: ACADEMIC_DOCUMENT_QUERY
-        
-        INSTRUCTIONS:
-        1. Context Usage: Priority is given to the provided Context.
-        2. Not Found: If the answer is NOT in the Context, you MAY use your own general knowledge to answer, but you MUST preface it with: "I could not find this specific information in the uploaded documents, but here is a general answer:".
-        3. Structure: Explain step-by-step. Use headings and bullet points.
-        4. Citations: If you use the Context, you MUST cite the document name and page number.
-           Format: [Source: filename (Page X)]
-        
-        Context: {context}
-        Chat History: {chat_history}
-        Question: {question}
-        
-        Answer:"""
-        
-        prompt = PromptTemplate(
-            input_variables=["context", "chat_history", "question"],
-            template=template
-        )
+        # Retrieval happens once per question in answer_question; the chain only
+        # formats the already-retrieved context and generates
+        return ACADEMIC_PROMPT | self.llm | StrOutputParser()
 
-        return ConversationalRetrievalChain.from_llm(
-            llm=self.llm,
-            retriever=retriever,
-            memory=self.memory,
-            return_source_documents=True,
-            combine_docs_chain_kwargs={"prompt": prompt},
-            verbose=True
-        )
+    def _build_filter(self, department: Optional[str], semester: Optional[str]) -> Optional[dict]:
+        """Chroma where-filter for the department/semester stamped on chunks at upload."""
+        conditions = [
+            {field: value}
+            for field, value in (("department", department), ("semester", semester))
+            if value and value.lower() not in ("all", "any")
+        ]
+        if not conditions:
+            return None
+        if len(conditions) == 1:
+            return conditions[0]
+        return {"$and": conditions}
+
+    def _cache_key(self, q_lower: str, where: Optional[dict]) -> str:
+        # Answers are only reused within the same filter scope
+        if not where:
+            return q_lower
+        return json.dumps(where, sort_keys=True) + CACHE_SCOPE_SEPARATOR + q_lower
 
     # [RESTORED METHOD]
     def determine_intent(self, question: str) -> str:
@@ -166,8 +414,14 @@ class RAGService:
             return "GENERAL_CHAT"
 
     # [RESTORED METHOD]
-    def process_document(self, file_path: str, metadata: dict = None) -> bool:
+    def process_document(self, file_path: str, metadata: dict = None, progress_callback=None) -> bool:
+        """
+        Loads, splits and indexes a document. progress_callback, if given, is
+        called as progress_callback(stage, done, total) while chunks are embedded.
+        """
+        report = progress_callback or (lambda stage, done=0, total=0: None)
         try:
+            report("loading")
             file_ext = os.path.splitext(file_path)[1].lower()
             if file_ext == ".pdf":
                 loader = PyPDFLoader(file_path)
@@ -180,22 +434,138 @@ class RAGService:
             else:
                 return False
                 
-            documents = loader.load()
-            text_splitter = RecursiveCharacterTextSplitter(chunk_size=1600, chunk_overlap=200)
-            chunks = text_splitter.split_documents(documents)
-            
-            if metadata:
-                for chunk in chunks:
-                    chunk.metadata.update(metadata)
-            
-            self.vector_store.add_documents(chunks)
+            source = (metadata or {}).get("source") or file_path
+            file_hash = file_sha256(file_path)
+            previous = self.manifest.get(source)
+            if previous and previous["sha256"] == file_hash and previous["metadata"] == (metadata or {}):
+                print(f"DEBUG: {source} unchanged since last index, skipping")
+                return True
+
+            if previous is None:
+                # Not tracked yet (e.g. indexed before the manifest existed): replace wholesale
+                self.vector_store.delete(where={"source": source})
+                self.keyword_index.remove_source(source)
+                self._delete_subchunks(source=source)
+                old_ids = set()
+            else:
+                old_ids = set(previous["chunk_ids"])
+            # Ids hash only the content, so new upload metadata (department, semester) would
+            # otherwise never reach chunks that already exist; rewrite all of them (embeddings
+            # come from the content-addressed cache, so this makes no API calls)
+            metadata_changed = previous is not None and previous["metadata"] != (metadata or {})
+            kept_ids = set() if metadata_changed else old_ids
+
+            # Pages are parsed, split and embedded as a stream; only a few batches are in memory at once
+            new_ids: List[str] = []
+            progress = {"pages": 0, "chunks": 0}
+            total_pages = self._page_count(file_path)
+            chunks = self._iter_chunks(loader, source, metadata, new_ids, progress)
+            new_chunks = (chunk for chunk in chunks if chunk.id not in kept_ids)
+
+            def estimated_total(done):
+                # Chunks per page so far, extrapolated to the whole file
+                if total_pages and progress["pages"]:
+                    return max(done, round(progress["chunks"] * total_pages / progress["pages"]))
+                return max(done, progress["chunks"])
+
+            report("embedding", 0, 0)
+            written = EmbeddingPipeline(self.embeddings, self.vector_store).run(
+                new_chunks,
+                progress_callback=lambda done, _: report("embedding", done, estimated_total(done)),
+                batch_callback=self._index_batch,
+            )
+
+            # Stale chunks are only known once the whole file has been read
+            stale_ids = list(old_ids - set(new_ids))
+            if stale_ids:
+                self.vector_store.delete(ids=stale_ids)
+                self.keyword_index.remove(stale_ids)
+                self._delete_subchunks(parent_ids=stale_ids)
+            print(f"DEBUG: {source}: {len(written)} new chunks, {len(stale_ids)} stale chunks removed")
+            report("embedding", len(written), len(written))
+
             self.vector_store.persist()
-            self.academic_chain = self._create_academic_chain()
+            self.keyword_index.save()
+            self.manifest.set(source, file_hash, metadata or {}, new_ids)
+            # Answers citing the old version, or general answers the new file may now cover
+            self.answer_cache.invalidate_source(source)
+            self.answer_cache.invalidate_general()
             return True
         except Exception as e:
             print(f"Error processing document: {e}")
             return False
 
+    def _index_batch(self, batch: List[Document]):
+        # Secondary indexes over chunks just written to the vector store
+        self.keyword_index.add_documents(batch)
+        if self.index_subchunks:
+            from backend.compression_retriever import index_subchunks
+            index_subchunks(self.vector_store, self.embeddings, batch)
+
+    def _delete_subchunks(self, parent_ids: Optional[List[str]] = None, source: Optional[str] = None):
+        from backend.compression_retriever import delete_subchunks
+        delete_subchunks(self.vector_store, parent_ids=parent_ids, source=source)
+
+    def _iter_chunks(self, loader, source: str, metadata: Optional[dict], ids: List[str], progress: dict):
+        """
+        Yields chunks page by page from loader.lazy_load(), each with its
+        deterministic id; ids and progress are filled in as pages are read.
+        """
+        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1600, chunk_overlap=200)
+        seen = {}
+        for page in loader.lazy_load():
+            progress["pages"] += 1
+            for chunk in text_splitter.split_documents([page]):
+                if metadata:
+                    chunk.metadata.update(metadata)
+                # Content-derived ids: unchanged chunks keep their id across re-indexes
+                page_number = chunk.metadata.get("page")
+                base_id = chunk_id(source, page_number, chunk.page_content)
+                occurrence = seen.get(base_id, 0)
+                seen[base_id] = occurrence + 1
+                chunk.id = base_id if occurrence == 0 else chunk_id(source, page_number, chunk.page_content, occurrence)
+                ids.append(chunk.id)
+                progress["chunks"] += 1
+                yield chunk
+
+    def _page_count(self, file_path: str) -> Optional[int]:
+        # PDF page count without extracting any text, for progress estimates
+        if not file_path.lower().endswith(".pdf"):
+            return None
+        try:
+            from pypdf import PdfReader
+            return len(PdfReader(file_path).pages)
+        except Exception:
+            return None
+
+    def reindex_directory(self, directory: Path, default_metadata: dict = None) -> dict:
+        """
+        Incrementally syncs the vector store with the files in directory:
+        unchanged files are skipped, changed files only swap their stale
+        chunks, and sources whose file is gone are deleted.
+        """
+        directory = Path(directory)
+        summary = {"indexed": [], "failed": [], "removed": []}
+        present = set()
+        for file_path in sorted(directory.iterdir()):
+            if not file_path.is_file() or file_path.suffix.lower() not in SUPPORTED_EXTENSIONS:
+                continue
+            present.add(file_path.name)
+            previous = self.manifest.get(file_path.name)
+            if previous:
+                metadata = previous["metadata"]
+            else:
+                metadata = {"source": file_path.name, **(default_metadata or {})}
+            if self.process_document(str(file_path), metadata):
+                summary["indexed"].append(file_path.name)
+            else:
+                summary["failed"].append(file_path.name)
+
+        for source in self.manifest.sources():
+            if source not in present and self.delete_document(source):
+                summary["removed"].append(source)
+        return summary
+
     # [RESTORED METHOD]
     def generate_summary(self, file_path: str) -> str:
         try:
@@ -209,10 +579,11 @@ class RAGService:
             else:
                 return "Unsupported file type."
 
-            documents = loader.load()
+            # Only the first 5 pages are parsed
+            documents = list(islice(loader.lazy_load(), 5))
             if not documents: return "Empty."
 
-            full_text = "\n".join([doc.page_content for doc in documents[:5]]) 
+            full_text = "\n".join([doc.page_content for doc in documents]) 
             if len(full_text) > 10000: full_text = full_text[:10000] + "..."
 
             summary_prompt = f"Summary (max 3-4 bullets):\n\n{full_text}"
@@ -230,88 +601,381 @@ class RAGService:
         "ai": "Artificial Intelligence is the ability of machines to perform tasks that require human intelligence.",
         "what is ai": "Artificial Intelligence is the ability of machines to perform tasks that require human intelligence."
     }
-    ANSWER_CACHE = {}
 
-    def answer_question(self, question: str) -> Tuple[str, List[str]]:
+    def answer_question(
+        self,
+        question: str,
+        department: Optional[str] = None,
+        semester: Optional[str] = None,
+        session_id: Optional[str] = None,
+    ) -> Tuple[str, List[str]]:
         print(f"DEBUG: answer_question called with: {question}", flush=True)
+        q_lower = self._normalize_question(question)
+        where = self._build_filter(department, semester)
+        cache_key = self._cache_key(q_lower, where)
         
-        import string
-        # Robust query normalization: remove punctuation, lower, strip
-        q_lower = question.lower().translate(str.maketrans('', '', string.punctuation)).strip()
-        
-        # Increment real stats
-        self._increment_query_count()
+        # Increment real stats (in-memory; flushed in the background)
+        self.metrics.record_query(department)
         
+        # 1 & 2. Common Responses / Exact Cache Hit (Zero Quota)
+        quick = self._quick_answer(q_lower, cache_key)
+        if quick is not None:
+            return quick
+
+        result, shared = self.single_flight.do(
+            cache_key, functools.partial(self._compute_answer, question, cache_key, where, session_id)
+        )
+        return self._finish_answer(question, session_id, result, shared)
+
+    def _compute_answer(self, question: str, cache_key: str, where, session_id: Optional[str]) -> Tuple[str, List[str], bool]:
+        """The uncached part of answer_question; returns (answer, sources, newly generated)."""
+        try:
+            # 3. Semantic Cache: one query embedding, reused for the relevance check
+            vector = self.embeddings.embed_query(question)
+            cached = self.answer_cache.get(cache_key, vector)
+            if cached is not None:
+                print("DEBUG: Returning Semantic Cache Response")
+                self.metrics.incr("semantic_cache_hits")
+                return (*cached, False)
+
+            # 4. Single retrieval: top-k with scores once, reused for routing and context
+            docs = self._select_context(question, vector, where)
+            if docs:
+                answer, source_docs = self._answer_academic(question, docs, session_id)
+            else:
+                answer, source_docs = self._answer_general(question, session_id)
+            return (*self._store_answer(cache_key, vector, answer, source_docs), True)
+
+        except Exception as e:
+            return (*self._handle_answer_error(e), False)
+
+    async def answer_question_async(
+        self,
+        question: str,
+        department: Optional[str] = None,
+        semester: Optional[str] = None,
+        session_id: Optional[str] = None,
+    ) -> Tuple[str, List[str]]:
+        """
+        Non-blocking variant of answer_question for the FastAPI event loop.
+        The chain runs through LangChain's native async path; blocking calls
+        (embeddings, Chroma search, genai SDK) go to the bounded executor.
+        """
+        print(f"DEBUG: answer_question_async called with: {question}", flush=True)
+        q_lower = self._normalize_question(question)
+        where = self._build_filter(department, semester)
+        cache_key = self._cache_key(q_lower, where)
+
+        self.metrics.record_query(department)
+
+        quick = self._quick_answer(q_lower, cache_key)
+        if quick is not None:
+            return quick
+
+        result, shared = await self.single_flight.do_async(
+            cache_key, functools.partial(self._compute_answer_async, question, cache_key, where, session_id)
+        )
+        return self._finish_answer(question, session_id, result, shared)
+
+    async def _compute_answer_async(self, question: str, cache_key: str, where, session_id: Optional[str]) -> Tuple[str, List[str], bool]:
+        try:
+            vector = await self._run_blocking(self.embeddings.embed_query, question)
+            cached = self.answer_cache.get(cache_key, vector)
+            if cached is not None:
+                print("DEBUG: Returning Semantic Cache Response")
+                self.metrics.incr("semantic_cache_hits")
+                return (*cached, False)
+
+            docs = await self._run_blocking(self._select_context, question, vector, where)
+            if docs:
+                answer, source_docs = await self._answer_academic_async(question, docs, session_id)
+            else:
+                answer, source_docs = await self._run_blocking(self._answer_general, question, session_id)
+            return (*self._store_answer(cache_key, vector, answer, source_docs), True)
+
+        except Exception as e:
+            return (*self._handle_answer_error(e), False)
+
+    def _finish_answer(self, question: str, session_id: Optional[str], result, shared: bool) -> Tuple[str, List[str]]:
+        answer, sources, generated = result
+        if shared:
+            print("DEBUG: Returning coalesced in-flight answer")
+            self.metrics.incr("coalesced")
+        # Every caller remembers its own turn, including those that shared another's answer
+        if generated:
+            self.session_memory.save(session_id, question, answer)
+        return answer, sources
+
+    async def _run_blocking(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args))
+
+    def _normalize_question(self, question: str) -> str:
+        # Robust query normalization: remove punctuation, lower, strip
+        return question.lower().translate(str.maketrans('', '', string.punctuation)).strip()
+
+    def _quick_answer(self, q_lower: str, cache_key: str) -> Optional[Tuple[str, List[str]]]:
         # 1. Check Common Responses (Zero Quota)
         if q_lower in self.COMMON_RESPONSES:
             print("DEBUG: Returning Common Response")
+            self.metrics.incr("common_responses")
             return self.COMMON_RESPONSES[q_lower], []
             
         # 2. Check Local Cache (Zero Quota)
-        if q_lower in self.ANSWER_CACHE:
+        cached = self.answer_cache.get_exact(cache_key)
+        if cached is not None:
             print("DEBUG: Returning Cached Response")
-            return self.ANSWER_CACHE[q_lower]
+            self.metrics.incr("cache_hits")
+            return cached
+        return None
+
+    def _store_answer(self, cache_key: str, vector, answer: str, source_docs) -> Tuple[str, List[str]]:
+        self.metrics.incr("academic_answers" if source_docs else "general_answers")
+        sources = self._format_sources(source_docs)
+        doc_sources = {doc.metadata.get("source") for doc in source_docs}
+        self.answer_cache.put(cache_key, answer, sources, vector=vector, doc_sources=doc_sources)
+        return answer, sources
+
+    def _select_context(self, question: str, vector, where: Optional[dict] = None) -> Optional[List[Document]]:
+        """
+        Retrieves once and routes: the documents to answer from, or None when
+        nothing is relevant enough and the general path should answer.
+        """
+        if self.retriever_type == "hybrid":
+            docs, best_distance, keyword_match = self.hybrid_retriever.search(question, vector, where=where)
+            print(f"DEBUG: Best Doc Score (Distance): {best_distance}, keyword identifier match: {keyword_match}")
+            # Exact course codes / clause numbers count even when the dense score is poor
+            if not (keyword_match or (best_distance is not None and best_distance < ACADEMIC_MAX_DISTANCE)):
+                return None
+        else:
+            docs_and_scores = self._retrieve(vector, where)
+            if not self._is_academic_query(docs_and_scores):
+                return None
+            docs = [doc for doc, _ in docs_and_scores]
+
+        if self.reranker_type == "local":
+            # Retrieve wide and cheap, send only the best few chunks to the LLM
+            docs = list(self.reranker.compress_documents(docs, question))
+        return docs
+
+    def _retrieve(self, vector, where: Optional[dict] = None) -> List[Tuple[Document, float]]:
+        return self.vector_store.similarity_search_by_vector_with_relevance_scores(
+            vector, k=self.retrieval_k, filter=where
+        )
 
+    def _is_academic_query(self, docs_and_scores: List[Tuple[Document, float]]) -> bool:
+        # 3. Smart Fallback (No extra LLM call)
+        # Search DB first. If good match -> Academic. Else -> General.
+        # The top result's score decides; results arrive sorted by distance.
+        # Note: Chroma L2 distance: Lower is better. 0 = identical. > 1 = unrelated.
+        # Threshold: 0.7 (Tunable)
+        if docs_and_scores:
+            doc, score = docs_and_scores[0]
+            print(f"DEBUG: Best Doc Score (Distance): {score} - {doc.metadata.get('source')}")
+            if score < ACADEMIC_MAX_DISTANCE: # Chroma default is L2. A safe bet for "relevant enough" is usually under 1.4 for embeddings. 1.2 is tight.
+                 return True
+        return False
+
+    def _format_sources(self, source_docs) -> List[str]:
+        sources = [
+            f"{doc.metadata.get('source', 'Unknown')} (Page {doc.metadata.get('page', 0)})" 
+            for doc in source_docs
+        ]
+        return list(set(sources))
+
+    def _academic_inputs(self, question: str, docs: List[Document], session_id: Optional[str]) -> Tuple[dict, List[Document]]:
+        """Chain inputs packed to the token budget, and the documents that made it into the context."""
+        context, chat_history, used = self.context_packer.pack(docs, self.session_memory.history(session_id))
+        inputs = {
+            "context": context,
+            "chat_history": chat_history,
+            "question": question,
+        }
+        return inputs, used
+
+    def _answer_academic(self, question: str, docs: List[Document], session_id: Optional[str] = None) -> Tuple[str, List[Document]]:
+        print("DEBUG: Mode -> ACADEMIC (Based on vector score)")
+        inputs, used = self._academic_inputs(question, docs, session_id)
+        answer = self._call_llm(self.academic_chain.invoke, inputs)
+        return answer, used
+
+    async def _answer_academic_async(self, question: str, docs: List[Document], session_id: Optional[str] = None) -> Tuple[str, List[Document]]:
+        print("DEBUG: Mode -> ACADEMIC (Based on vector score)")
+        # Token counting is CPU work (and loads the tokenizer if warm-up has not)
+        inputs, used = await self._run_blocking(self._academic_inputs, question, docs, session_id)
+        answer = await self._call_llm_async(self.academic_chain.ainvoke, inputs)
+        return answer, used
+
+    def _answer_general(self, question: str, session_id: Optional[str] = None) -> Tuple[str, List[Document]]:
+        print("DEBUG: Mode -> GENERAL (Low vector score or no docs)")
+        # Manual General Chat
+        history = self.session_memory.format_history(session_id)
+        # Reduced tokens for general chat
+        response = self._call_llm(
+            self.genai_model.generate_content,
+            self._general_prompt(question, history),
+            generation_config=_load_genai().types.GenerationConfig(max_output_tokens=60),
+        )
+        return response.text, []
+
+    def _summarize_turns(self, previous_summary: str, turns: List[Tuple[str, str]]) -> str:
+        transcript = "\n".join(f"Human: {q}\nAssistant: {a}" for q, a in turns)
+        prompt = f"""Update the running summary of this student's conversation in at most 3 sentences.
+        Current summary: {previous_summary or "(none)"}
+        New turns:
+        {transcript}
+        Updated summary:"""
+        response = self._call_llm(
+            self.genai_model.generate_content,
+            prompt,
+            generation_config=_load_genai().types.GenerationConfig(max_output_tokens=120),
+        )
+        return response.text
+
+    def _call_llm(self, func, *args, **kwargs):
+        """Runs one upstream LLM call under the quota governor (may wait, or raise QuotaExceededError)."""
+        self.llm_governor.acquire()
         try:
-            if not self.academic_chain:
-                 pass
-
-            # 3. Smart Fallback (No extra LLM call)
-            # Search DB first. If good match -> Academic. Else -> General.
-            # Using k=1 to check relevance score.
-            # Note: Chroma L2 distance: Lower is better. 0 = identical. > 1 = unrelated.
-            # Threshold: 0.7 (Tunable)
-            
-            docs_and_scores = self.vector_store.similarity_search_with_score(question, k=1)
-            
-            is_academic = False
-            if docs_and_scores:
-                doc, score = docs_and_scores[0]
-                print(f"DEBUG: Best Doc Score (Distance): {score} - {doc.metadata.get('source')}")
-                if score < 1.2: # Chroma default is L2. A safe bet for "relevant enough" is usually under 1.4 for embeddings. 1.2 is tight.
-                     is_academic = True
-            
-            answer = ""
-            sources = []
-
-            if is_academic:
-                print("DEBUG: Mode -> ACADEMIC (Based on vector score)")
-                response = self.academic_chain.invoke({"question": question})
-                answer = response["answer"]
-                source_docs = response.get("source_documents", [])
-                sources = [
-                    f"{doc.metadata.get('source', 'Unknown')} (Page {doc.metadata.get('page', 0)})" 
-                    for doc in source_docs
-                ]
-                sources = list(set(sources))
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self.llm_governor.record_error(e)
+            raise
+        self.llm_governor.record_success()
+        return result
+
+    async def _call_llm_async(self, func, *args, **kwargs):
+        await self.llm_governor.acquire_async()
+        try:
+            result = await func(*args, **kwargs)
+        except Exception as e:
+            self.llm_governor.record_error(e)
+            raise
+        self.llm_governor.record_success()
+        return result
+
+    def _general_prompt(self, question: str, history) -> str:
+        return f"""You are CollegeBot. Be friendly and concise (max 2 sentences).
+        Chat History: {history}
+        Question: {question}
+        Answer:"""
+
+    async def answer_question_stream(
+        self,
+        question: str,
+        department: Optional[str] = None,
+        semester: Optional[str] = None,
+        session_id: Optional[str] = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Streams an answer as events: sources first, then answer tokens as the
+        LLM produces them, then a final done event. The completed answer is
+        written to the answer cache and memory once generation finishes.
+        """
+        print(f"DEBUG: answer_question_stream called with: {question}", flush=True)
+        q_lower = self._normalize_question(question)
+        where = self._build_filter(department, semester)
+        cache_key = self._cache_key(q_lower, where)
+
+        self.metrics.record_query(department)
+
+        quick = self._quick_answer(q_lower, cache_key)
+        if quick is not None:
+            answer, sources = quick
+            yield {"type": "sources", "sources": sources}
+            yield {"type": "token", "text": answer}
+            yield {"type": "done"}
+            return
+
+        try:
+            vector = await self._run_blocking(self.embeddings.embed_query, question)
+            cached = self.answer_cache.get(cache_key, vector)
+            if cached is not None:
+                print("DEBUG: Returning Semantic Cache Response")
+                self.metrics.incr("semantic_cache_hits")
+                answer, sources = cached
+                yield {"type": "sources", "sources": sources}
+                yield {"type": "token", "text": answer}
+                yield {"type": "done"}
+                return
+
+            parts = []
+            docs = await self._run_blocking(self._select_context, question, vector, where)
+            await self.llm_governor.acquire_async()
+            if docs:
+                print("DEBUG: Mode -> ACADEMIC (streaming)")
+                inputs, docs = await self._run_blocking(self._academic_inputs, question, docs, session_id)
+                yield {"type": "sources", "sources": self._format_sources(docs)}
+
+                async for text in self.academic_chain.astream(inputs):
+                    if text:
+                        parts.append(text)
+                        yield {"type": "token", "text": text}
             else:
-                print("DEBUG: Mode -> GENERAL (Low vector score or no docs)")
-                # Manual General Chat
-                history = self.memory.load_memory_variables({})['chat_history']
-                general_prompt = f"""You are CollegeBot. Be friendly and concise (max 2 sentences).
-                Chat History: {history}
-                Question: {question}
-                Answer:"""
-                
-                # Reduced tokens for general chat
-                response = self.genai_model.generate_content(
-                    general_prompt, 
-                    generation_config=genai.types.GenerationConfig(max_output_tokens=60)
-                )
-                answer = response.text
-                self.memory.save_context({"question": question}, {"answer": answer})
-                sources = []
-
-            # Update Cache
-            self.ANSWER_CACHE[q_lower] = (answer, sources)
-            return answer, sources
+                print("DEBUG: Mode -> GENERAL (streaming)")
+                docs = []
+                yield {"type": "sources", "sources": []}
+
+                history = self.session_memory.format_history(session_id)
+
+                def generate():
+                    return self.genai_model.generate_content(
+                        self._general_prompt(question, history),
+                        generation_config=_load_genai().types.GenerationConfig(max_output_tokens=60),
+                        stream=True,
+                    )
+
+                async for chunk in self._iterate_blocking(generate):
+                    if chunk.text:
+                        parts.append(chunk.text)
+                        yield {"type": "token", "text": chunk.text}
+
+            self.llm_governor.record_success()
+            answer = "".join(parts)
+            # An empty stream (e.g. a blocked response) must not be remembered or cached
+            if answer.strip():
+                self.session_memory.save(session_id, question, answer)
+                self._store_answer(cache_key, vector, answer, docs)
+            else:
+                print("DEBUG: Stream produced no text, not caching")
+            yield {"type": "done"}
 
         except Exception as e:
-            print(f"DEBUG ERROR in answer_question: {e}")
-            error_msg = str(e)
-            if "429" in error_msg or "Quota exceeded" in error_msg or "ResourceExhausted" in error_msg:
-                return "I'm currently receiving too many requests (Quota Exceeded). Please wait 30-60 seconds and try again.", []
-            return "Sorry, I encountered an internal error. Please try again later.", []
+            self.llm_governor.record_error(e)
+            message, _ = self._handle_answer_error(e)
+            yield {"type": "error", "message": message}
+
+    async def _iterate_blocking(self, make_iterator):
+        """Drains a blocking iterator on the executor, yielding items on the event loop."""
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        finished = object()
+
+        def worker():
+            try:
+                for item in make_iterator():
+                    loop.call_soon_threadsafe(queue.put_nowait, item)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, finished)
+
+        loop.run_in_executor(self.executor, worker)
+        while True:
+            item = await queue.get()
+            if item is finished:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def _handle_answer_error(self, e: Exception) -> Tuple[str, List[str]]:
+        print(f"DEBUG ERROR in answer_question: {e}")
+        self.metrics.incr("errors")
+        if isinstance(e, QuotaExceededError):
+            self.metrics.incr("llm_shed")
+        if isinstance(e, QuotaExceededError) or is_rate_limit_error(e):
+            return "I'm currently receiving too many requests (Quota Exceeded). Please wait 30-60 seconds and try again.", []
+        return "Sorry, I encountered an internal error. Please try again later.", []
 
     # [NEW METHOD]
     def delete_document(self, filename: str) -> bool:
@@ -323,16 +987,40 @@ class RAGService:
             # ChromaDB delete by where clause
             self.vector_store.delete(where={"source": filename})
             self.vector_store.persist()
+            self.keyword_index.remove_source(filename)
+            self.keyword_index.save()
+            self._delete_subchunks(source=filename)
+            self.manifest.remove(filename)
             
-            # Also remove from cache if exists (optional, but good practice)
-            # Clearing entire cache is safer/easier than finding specific keys
-            self.ANSWER_CACHE.clear() 
+            # Drop only the cached answers that cited this document
+            self.answer_cache.invalidate_source(filename)
             
             return True
         except Exception as e:
             print(f"Error deleting document: {e}")
             return False
 
+    def reset_index(self):
+        """
+        Empties this embeddings backend's collection, its sub-chunks, keyword
+        index and manifest, for a full rebuild. Other backends' collections
+        and the embedding cache are left alone.
+        """
+        from chromadb.errors import NotFoundError
+        from backend.compression_retriever import SUBCHUNK_SUFFIX
+        client = self.vector_store._client
+        for name in (self.collection_name, self.collection_name + SUBCHUNK_SUFFIX):
+            try:
+                client.delete_collection(name)
+            except (NotFoundError, ValueError):
+                pass
+        # Recreated (empty) on next access
+        self.__dict__.pop("vector_store", None)
+        self.__dict__.pop("hybrid_retriever", None)
+        self.keyword_index.clear()
+        self.manifest.clear()
+        self.answer_cache.clear()
+
     def get_documents(self) -> List[dict]:
         """
         Retrieves a list of unique documents from the vector store metadata.
@@ -360,34 +1048,22 @@ class RAGService:
             return []
 
     # [STATS METHODS]
-    def _init_stats_file(self):
-        if not self.stats_file.parent.exists():
-            self.stats_file.parent.mkdir(parents=True, exist_ok=True)
-        if not self.stats_file.exists():
-            with open(self.stats_file, 'w') as f:
-                json.dump({"total_queries": 0, "unique_students": 12}, f) # Start with base mock for students
-
-    def _get_persistent_stats(self):
-        try:
-            with open(self.stats_file, 'r') as f:
-                return json.load(f)
-        except:
-            return {"total_queries": 0, "unique_students": 12}
-
-    def _increment_query_count(self):
-        stats = self._get_persistent_stats()
-        stats["total_queries"] += 1
-        with open(self.stats_file, 'w') as f:
-            json.dump(stats, f)
-
     def get_stats(self) -> dict:
         """
         Returns system statistics.
         """
         docs = self.get_documents()
-        p_stats = self._get_persistent_stats()
+        snapshot = self.metrics.snapshot()
+        counters = snapshot["counters"]
         return {
             "total_documents": len(docs),
-            "active_students": p_stats.get("unique_students", 0),
-            "queries_today": p_stats.get("total_queries", 0)
+            "active_students": counters.get("unique_students", 0),
+            "queries_today": snapshot["queries_today"],
+            "total_queries": counters.get("queries", 0),
+            "queries_per_minute": snapshot["queries_per_minute"],
+            "queries_by_department": snapshot["departments"],
+            "counters": counters,
+            "embedding_cache": self.embeddings.cache.stats(),
+            "query_embedding_cache": self.embeddings.query_cache.stats(),
+            "answer_cache": self.answer_cache.stats()
         }
@@ -0,0 +1,277 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+RATE_LIMIT_DB = Path("data/rate_limits.db")
+PERIOD_SECONDS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+class QuotaExceededError(Exception):
+    """Raised when an LLM call would wait longer than allowed for the shared quota."""
+
+
+def parse_rate(limit: str) -> Tuple[float, int]:
+    """'20/minute' -> (tokens per second, burst size); periods are second, minute, hour or day."""
+    count, period = limit.strip().lower().split("/")
+    period = period.rstrip("s")
+    return int(count) / PERIOD_SECONDS[period], max(1, int(count))
+
+
+def is_rate_limit_error(e: Exception) -> bool:
+    """True for upstream 429 / quota errors, checking status codes before falling back to the message."""
+    seen = set()
+    while e is not None and id(e) not in seen:
+        seen.add(id(e))
+        if isinstance(e, QuotaExceededError):
+            # Our own shedding, not an upstream signal
+            return False
+        # google.api_core ResourceExhausted has code 429; OpenAI / httpx errors carry status_code
+        for attr in ("code", "status_code"):
+            if getattr(e, attr, None) == 429:
+                return True
+        error_msg = str(e)
+        if "429" in error_msg or "Quota exceeded" in error_msg or "ResourceExhausted" in error_msg:
+            return True
+        # LangChain wraps SDK errors; look at the original
+        e = e.__cause__ or e.__context__
+    return False
+
+
+class TokenBucket:
+    """
+    Token bucket refilled at rate tokens/second up to capacity. Tokens may go
+    negative: a caller that is willing to wait reserves a token and is told
+    how long to sleep, so waiting callers are served in order.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, max_wait: float = 0.0) -> Tuple[bool, float]:
+        """
+        Takes one token. Returns (True, seconds to wait before proceeding), or
+        (False, seconds until a token is free) if that would exceed max_wait.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            wait = max(0.0, (1 - self._tokens) / self.rate)
+            if wait > max_wait:
+                return False, wait
+            self._tokens -= 1
+            return True, wait
+
+    def set_rate(self, rate: float):
+        with self._lock:
+            # Tokens earned so far accrue at the old rate
+            self._refill(time.monotonic())
+            self.rate = rate
+
+    def drain(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 0.0)
+
+
+class UserRateLimiter:
+    """
+    Per-user token buckets with per-role limits, so each authenticated user
+    gets their own allowance regardless of shared IPs (campus NAT).
+    Buckets of users idle longest are dropped beyond max_entries.
+
+    Buckets live in this process: with N uvicorn workers a user gets up to
+    N times the limit. SQLiteUserRateLimiter shares them across workers.
+    """
+
+    def __init__(self, limits: Dict[str, str], default_limit: str, max_entries: int = 10000):
+        self.limits = {role: parse_rate(limit) for role, limit in limits.items()}
+        self.default = parse_rate(default_limit)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._buckets: "OrderedDict[str, Tuple[Optional[str], TokenBucket]]" = OrderedDict()
+
+    @classmethod
+    def from_env(cls) -> "UserRateLimiter":
+        # Per worker process unless this is a SQLiteUserRateLimiter
+        return cls(
+            limits={
+                "student": os.getenv("CHAT_RATE_LIMIT_STUDENT", "20/minute"),
+                "admin": os.getenv("CHAT_RATE_LIMIT_ADMIN", "120/minute"),
+            },
+            default_limit=os.getenv("CHAT_RATE_LIMIT_DEFAULT", "20/minute"),
+        )
+
+    def _bucket(self, username: str, role: Optional[str]) -> TokenBucket:
+        with self._lock:
+            entry = self._buckets.get(username)
+            # A user whose role changed (e.g. promoted to admin) gets the new role's limit
+            if entry is None or entry[0] != role:
+                entry = (role, TokenBucket(*self.limits.get(role, self.default)))
+                self._buckets[username] = entry
+                while len(self._buckets) > self.max_entries:
+                    self._buckets.popitem(last=False)
+            self._buckets.move_to_end(username)
+            return entry[1]
+
+    def check(self, username: str, role: Optional[str] = None) -> Optional[float]:
+        """Consumes one request; returns None if allowed, else seconds until the user may retry."""
+        allowed, wait = self._bucket(username, role).reserve()
+        return None if allowed else wait
+
+
+class SQLiteUserRateLimiter(UserRateLimiter):
+    """
+    The same per-user, per-role token buckets kept in a SQLite file (WAL
+    mode) shared by all uvicorn workers, so a user's allowance does not
+    multiply with the worker count. Each check is one short write
+    transaction. Rows idle long enough to have refilled completely are
+    pruned, which loses nothing.
+    """
+
+    PRUNE_EVERY = 1000
+
+    def __init__(self, limits: Dict[str, str], default_limit: str, db_path: Optional[Path] = None):
+        super().__init__(limits, default_limit)
+        self.db_path = Path(db_path or os.getenv("RATE_LIMIT_PATH", str(RATE_LIMIT_DB)))
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS buckets (
+                username TEXT PRIMARY KEY,
+                role TEXT,
+                tokens REAL NOT NULL,
+                updated REAL NOT NULL
+            )
+        """)
+        # Seconds for the slowest bucket to refill from empty
+        self._refill_seconds = max(capacity / rate for rate, capacity in [self.default, *self.limits.values()])
+        self._checks = 0
+
+    def check(self, username: str, role: Optional[str] = None) -> Optional[float]:
+        rate, capacity = self.limits.get(role, self.default)
+        with self._lock:
+            now = time.time()
+            # Read-modify-write under the database write lock, so workers cannot both take the last token
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT role, tokens, updated FROM buckets WHERE username = ?",
+                                         (username,)).fetchone()
+                if row is None or row[0] != role:
+                    tokens = capacity
+                else:
+                    tokens = min(capacity, row[1] + max(0.0, now - row[2]) * rate)
+                wait = None if tokens >= 1 else (1 - tokens) / rate
+                if wait is None:
+                    tokens -= 1
+                self._conn.execute("INSERT OR REPLACE INTO buckets (username, role, tokens, updated) VALUES (?, ?, ?, ?)",
+                                   (username, role, tokens, now))
+                self._checks += 1
+                if self._checks % self.PRUNE_EVERY == 0:
+                    self._conn.execute("DELETE FROM buckets WHERE updated < ?", (now - self._refill_seconds,))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return wait
+
+
+def create_user_rate_limiter() -> UserRateLimiter:
+    """Selects where chat rate limit buckets live from RATE_LIMIT_BACKEND (memory: per worker, or sqlite: shared)."""
+    backend = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+    if backend == "sqlite":
+        return SQLiteUserRateLimiter.from_env()
+    return UserRateLimiter.from_env()
+
+
+class LLMQuotaGovernor:
+    """
+    Process-wide budget for upstream LLM calls. Calls queue for a token up to
+    max_wait seconds and are shed with QuotaExceededError beyond that, so we
+    slow down before the provider starts returning 429s. The rate adapts
+    AIMD-style: halved on an upstream 429 (at most once per decrease_interval),
+    then raised linearly by increase_fraction of max_rate per second of
+    successful calls, back up to max_rate.
+    """
+
+    def __init__(
+        self,
+        max_rate: float,
+        burst: int,
+        max_wait: float,
+        min_rate_fraction: float = 0.05,
+        increase_fraction: float = 0.05,
+        decrease_interval: float = 2.0,
+    ):
+        self.max_rate = max_rate
+        self.min_rate = max_rate * min_rate_fraction
+        self.increase_per_second = max_rate * increase_fraction
+        self.max_wait = max_wait
+        self.decrease_interval = decrease_interval
+        self.bucket = TokenBucket(max_rate, burst)
+        self._last_decrease = float("-inf")
+        self._last_increase = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "LLMQuotaGovernor":
+        # Limits are per worker process; divide the provider quota by the worker count
+        rate, _ = parse_rate(os.getenv("LLM_RATE_LIMIT", "60/minute"))
+        return cls(
+            max_rate=rate,
+            burst=int(os.getenv("LLM_RATE_BURST", "5")),
+            max_wait=float(os.getenv("LLM_QUEUE_TIMEOUT", "10")),
+        )
+
+    @property
+    def rate(self) -> float:
+        return self.bucket.rate
+
+    def _reserve(self) -> float:
+        allowed, wait = self.bucket.reserve(self.max_wait)
+        if not allowed:
+            raise QuotaExceededError(f"LLM quota busy; next slot in {wait:.1f}s")
+        return wait
+
+    def acquire(self):
+        wait = self._reserve()
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        wait = self._reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+    def record_success(self):
+        with self._lock:
+            now = time.monotonic()
+            elapsed, self._last_increase = now - self._last_increase, now
+            if self.bucket.rate < self.max_rate:
+                self.bucket.set_rate(min(self.max_rate, self.bucket.rate + self.increase_per_second * elapsed))
+
+    def record_error(self, e: Exception):
+        if not is_rate_limit_error(e):
+            return
+        with self._lock:
+            now = time.monotonic()
+            # Concurrent calls fail together on one overload; count it once
+            if now - self._last_decrease < self.decrease_interval:
+                return
+            self._last_decrease = self._last_increase = now
+            self.bucket.set_rate(max(self.min_rate, self.bucket.rate / 2))
+        self.bucket.drain()
+        print(f"DEBUG: LLM rate limited upstream; budget lowered to {self.bucket.rate * 60:.1f}/minute")
@@ -1,4 +1,3 @@
-
 import os
 from pathlib import Path
 from backend.rag_engine import RAGService
@@ -12,24 +11,14 @@ def reindex():
         print("No temp directory found.")
         return
 
-    files = [f for f in tmp_dir.iterdir() if f.is_file()]
-    print(f"Found {len(files)} files to re-index.")
-
-    for file_path in files:
-        print(f"Processing {file_path.name}...")
-        # Guess metadata or leave generic
-        metadata = {
-            "source": file_path.name,
-            "reindexed": True
-        }
-        try:
-            success = rag.process_document(str(file_path), metadata)
-            if success:
-                print(f"Successfully indexed {file_path.name}")
-            else:
-                print(f"Failed to index {file_path.name}")
-        except Exception as e:
-            print(f"Error indexing {file_path.name}: {e}")
+    # Incremental: unchanged files are skipped, changed files only swap stale chunks
+    result = rag.reindex_directory(tmp_dir, default_metadata={"reindexed": True})
+    for name in result["indexed"]:
+        print(f"Successfully indexed {name}")
+    for name in result["failed"]:
+        print(f"Failed to index {name}")
+    for name in result["removed"]:
+        print(f"Removed {name} (file no longer present)")
 
     print("Re-indexing complete.")
 
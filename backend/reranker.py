@@ -0,0 +1,75 @@
+import functools
+import importlib.util
+import os
+from typing import Optional, Sequence
+
+from langchain_core.callbacks import Callbacks
+from langchain_core.documents import BaseDocumentCompressor, Document
+
+DEFAULT_RERANKER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+def check_available():
+    """Raises with an install hint if sentence-transformers is missing (without importing it)."""
+    if importlib.util.find_spec("sentence_transformers") is None:
+        raise RuntimeError(
+            "RERANKER=local needs the sentence-transformers package; "
+            "install it with: pip install -r requirements-local.txt"
+        )
+
+
+@functools.lru_cache(maxsize=None)
+def _load_cross_encoder(model_name: str, max_length: int):
+    # Imported here so the package is only needed when reranking is enabled
+    from sentence_transformers import CrossEncoder
+    threads = os.getenv("RERANKER_THREADS")
+    if threads:
+        import torch
+        torch.set_num_threads(int(threads))
+    return CrossEncoder(model_name, device="cpu", max_length=max_length)
+
+
+class LocalReranker(BaseDocumentCompressor):
+    """
+    Reorders retrieved documents with a small cross-encoder running on CPU
+    and keeps the top_n. A drop-in, network-free alternative to CohereRerank
+    for ContextualCompressionRetriever. The model is loaded once per process.
+    """
+
+    model_name: str = DEFAULT_RERANKER_MODEL
+    top_n: int = 5
+    batch_size: int = 32
+    # Query + chunk tokens scored per pair; longer chunks are truncated
+    max_length: int = 512
+
+    @classmethod
+    def from_env(cls, top_n: Optional[int] = None) -> "LocalReranker":
+        return cls(
+            model_name=os.getenv("RERANKER_MODEL", DEFAULT_RERANKER_MODEL),
+            top_n=top_n or int(os.getenv("RERANK_TOP_N", "5")),
+            batch_size=int(os.getenv("RERANKER_BATCH_SIZE", "32")),
+        )
+
+    @property
+    def model(self):
+        return _load_cross_encoder(self.model_name, self.max_length)
+
+    def compress_documents(
+        self,
+        documents: Sequence[Document],
+        query: str,
+        callbacks: Optional[Callbacks] = None,
+    ) -> Sequence[Document]:
+        if not documents:
+            return []
+        scores = self.model.predict(
+            [(query, doc.page_content) for doc in documents],
+            batch_size=self.batch_size,
+            show_progress_bar=False,
+        )
+        ranked = sorted(zip(documents, scores), key=lambda pair: pair[1], reverse=True)[:self.top_n]
+        results = []
+        for doc, score in ranked:
+            reranked = Document(page_content=doc.page_content, metadata={**doc.metadata, "relevance_score": float(score)}, id=doc.id)
+            results.append(reranked)
+        return results
@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Executor
+from typing import Callable, List, Optional, Tuple
+
+DEFAULT_SESSION = "default"
+
+
+def estimate_tokens(text: str) -> int:
+    # Rough English average of ~4 characters per token
+    return len(text) // 4 + 1
+
+
+def format_turns(turns: List[Tuple[str, str]]) -> str:
+    return "\n".join(f"Human: {q}\nAssistant: {a}" for q, a in turns)
+
+
+class _Session:
+    __slots__ = ("turns", "summary", "last_active", "pending", "summarizing")
+
+    def __init__(self):
+        self.turns = deque()
+        self.summary = ""
+        self.last_active = time.time()
+        # Dropped turns not yet folded into the summary
+        self.pending = []
+        self.summarizing = False
+
+
+class SessionMemoryStore:
+    """
+    Conversation history per user/session. Each session keeps at most
+    max_turns question/answer pairs and at most max_tokens of history; older
+    turns are dropped (or folded into a running summary when a summarizer is
+    configured). Sessions idle for longer than idle_seconds are evicted.
+
+    The summarizer is usually an LLM call, so with an executor it runs there
+    in the background, one job per session at a time; save() never waits.
+    """
+
+    def __init__(
+        self,
+        max_turns: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+        idle_seconds: Optional[float] = None,
+        max_sessions: Optional[int] = None,
+        summarizer: Optional[Callable[[str, List[Tuple[str, str]]], str]] = None,
+        executor: Optional[Executor] = None,
+    ):
+        self.max_turns = max_turns or int(os.getenv("MEMORY_MAX_TURNS", "6"))
+        self.max_tokens = max_tokens or int(os.getenv("MEMORY_MAX_TOKENS", "1500"))
+        self.idle_seconds = idle_seconds or float(os.getenv("MEMORY_IDLE_SECONDS", "1800"))
+        self.max_sessions = max_sessions or int(os.getenv("MEMORY_MAX_SESSIONS", "10000"))
+        self.summarizer = summarizer
+        self.executor = executor
+
+        self._lock = threading.Lock()
+        # Ordered by last activity, oldest first
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+
+    def history(self, session_id: Optional[str]) -> List[Tuple[str, str]]:
+        """Returns (question, answer) turns, oldest first, with any summary as the first turn."""
+        with self._lock:
+            self._evict_idle()
+            session = self._sessions.get(session_id or DEFAULT_SESSION)
+            if session is None:
+                return []
+            # Turns still being summarized stay visible until the summary lands
+            turns = list(session.pending) + list(session.turns)
+            if session.summary:
+                turns.insert(0, ("Summary of the earlier conversation", session.summary))
+            return turns
+
+    def format_history(self, session_id: Optional[str]) -> str:
+        return format_turns(self.history(session_id))
+
+    def save(self, session_id: Optional[str], question: str, answer: str):
+        summarize = False
+        with self._lock:
+            key = session_id or DEFAULT_SESSION
+            session = self._sessions.pop(key, None) or _Session()
+            session.turns.append((question, answer))
+            session.last_active = time.time()
+            self._sessions[key] = session
+
+            total = sum(estimate_tokens(q) + estimate_tokens(a) for q, a in session.turns)
+            while session.turns and (len(session.turns) > self.max_turns or total > self.max_tokens):
+                q, a = session.turns.popleft()
+                total -= estimate_tokens(q) + estimate_tokens(a)
+                if self.summarizer:
+                    session.pending.append((q, a))
+
+            if session.pending and not session.summarizing:
+                session.summarizing = summarize = True
+
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            self._evict_idle()
+
+        if summarize:
+            if self.executor is not None:
+                self.executor.submit(self._summarize, session_id, session)
+            else:
+                self._summarize(session_id, session)
+
+    def _summarize(self, session_id: Optional[str], session: _Session):
+        # Turns dropped while a summary is in flight are folded in by the next pass
+        while True:
+            with self._lock:
+                if not session.pending:
+                    session.summarizing = False
+                    return
+                dropped, session.pending = session.pending, []
+                previous_summary = session.summary
+            # Summarize outside the lock: this may be an LLM call
+            try:
+                summary = self.summarizer(previous_summary, dropped)
+                with self._lock:
+                    session.summary = summary
+            except Exception as e:
+                print(f"DEBUG ERROR summarizing session {session_id}: {e}")
+
+    def clear(self, session_id: Optional[str]):
+        with self._lock:
+            self._sessions.pop(session_id or DEFAULT_SESSION, None)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _evict_idle(self):
+        cutoff = time.time() - self.idle_seconds
+        while self._sessions:
+            oldest_key = next(iter(self._sessions))
+            if self._sessions[oldest_key].last_active >= cutoff:
+                break
+            self._sessions.popitem(last=False)
@@ -0,0 +1,225 @@
+import sys
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.rate_limit import (
+    LLMQuotaGovernor,
+    QuotaExceededError,
+    SQLiteUserRateLimiter,
+    TokenBucket,
+    UserRateLimiter,
+    parse_rate,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class QuotaError(Exception):
+    code = 429
+
+
+class ClockTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        for name in ("monotonic", "time"):
+            patcher = mock.patch(f"backend.rate_limit.time.{name}", self.clock)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+
+class TokenBucketTest(ClockTestCase):
+    def test_burst_then_refuses_without_waiting(self):
+        bucket = TokenBucket(rate=2.0, capacity=3)
+        for _ in range(3):
+            self.assertEqual(bucket.reserve(), (True, 0.0))
+        allowed, wait = bucket.reserve()
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(wait, 0.5)
+
+    def test_refused_reservation_takes_no_token(self):
+        bucket = TokenBucket(rate=1.0, capacity=1)
+        bucket.reserve()
+        for _ in range(5):
+            self.assertFalse(bucket.reserve()[0])
+        self.clock.advance(1.0)
+        self.assertEqual(bucket.reserve(), (True, 0.0))
+
+    def test_waiting_callers_are_queued_in_order(self):
+        bucket = TokenBucket(rate=2.0, capacity=1)
+        self.assertEqual(bucket.reserve(max_wait=5), (True, 0.0))
+        waits = [bucket.reserve(max_wait=5)[1] for _ in range(3)]
+        for got, expected in zip(waits, [0.5, 1.0, 1.5]):
+            self.assertAlmostEqual(got, expected)
+        # The next one would wait 2s, more than it is willing to
+        allowed, wait = bucket.reserve(max_wait=1.0)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(wait, 2.0)
+
+    def test_refills_up_to_capacity(self):
+        bucket = TokenBucket(rate=1.0, capacity=2)
+        bucket.reserve()
+        bucket.reserve()
+        self.clock.advance(100)
+        self.assertTrue(bucket.reserve()[0])
+        self.assertTrue(bucket.reserve()[0])
+        self.assertFalse(bucket.reserve()[0])
+
+    def test_drain_empties_but_keeps_debt(self):
+        bucket = TokenBucket(rate=1.0, capacity=5)
+        bucket.drain()
+        allowed, wait = bucket.reserve()
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(wait, 1.0)
+
+
+class UserRateLimiterTest(ClockTestCase):
+    def test_limits_follow_role(self):
+        limiter = UserRateLimiter({"student": "2/minute", "admin": "5/minute"}, default_limit="1/minute")
+        self.assertIsNone(limiter.check("alice", "student"))
+        self.assertIsNone(limiter.check("alice", "student"))
+        self.assertIsNotNone(limiter.check("alice", "student"))
+        # Promoted to admin: a fresh bucket with the admin limit
+        for _ in range(5):
+            self.assertIsNone(limiter.check("alice", "admin"))
+        self.assertIsNotNone(limiter.check("alice", "admin"))
+        self.assertIsNone(limiter.check("bob", None))
+        self.assertIsNotNone(limiter.check("bob", None))
+
+    def test_idle_users_are_evicted(self):
+        limiter = UserRateLimiter({}, default_limit="1/minute", max_entries=2)
+        for user in ("a", "b", "c"):
+            limiter.check(user)
+        self.assertEqual(list(limiter._buckets), ["b", "c"])
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate("20/minute"), (20 / 60, 20))
+        self.assertEqual(parse_rate("5/seconds"), (5.0, 5))
+
+
+class SQLiteUserRateLimiterTest(ClockTestCase):
+    def make_limiters(self, count=2):
+        # One limiter per simulated worker, all on the same file
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = Path(tmp.name) / "rate_limits.db"
+        return [SQLiteUserRateLimiter({"student": "3/minute", "admin": "6/minute"}, default_limit="1/minute",
+                                      db_path=path) for _ in range(count)]
+
+    def test_limit_is_shared_across_workers(self):
+        first, second = self.make_limiters()
+        self.assertIsNone(first.check("alice", "student"))
+        self.assertIsNone(second.check("alice", "student"))
+        self.assertIsNone(first.check("alice", "student"))
+        retry_after = second.check("alice", "student")
+        self.assertAlmostEqual(retry_after, 20.0)
+        self.assertIsNotNone(first.check("alice", "student"))
+        # Other users have their own buckets
+        self.assertIsNone(second.check("bob", "student"))
+
+    def test_refills_over_time(self):
+        first, second = self.make_limiters()
+        for _ in range(3):
+            first.check("alice", "student")
+        self.clock.advance(20.0)
+        self.assertIsNone(second.check("alice", "student"))
+        self.assertIsNotNone(first.check("alice", "student"))
+
+    def test_role_change_rebuilds_bucket(self):
+        first, second = self.make_limiters()
+        for _ in range(3):
+            first.check("alice", "student")
+        self.assertIsNotNone(first.check("alice", "student"))
+        self.assertIsNone(second.check("alice", "admin"))
+
+    def test_prunes_only_fully_refilled_rows(self):
+        (limiter,) = self.make_limiters(1)
+        limiter.PRUNE_EVERY = 2
+        limiter.check("idle", "student")
+        # Long enough for the slowest (1/minute) bucket to refill
+        self.clock.advance(61.0)
+        limiter.check("busy", "student")
+        users = [row[0] for row in limiter._conn.execute("SELECT username FROM buckets")]
+        self.assertEqual(users, ["busy"])
+
+
+class LLMQuotaGovernorTest(ClockTestCase):
+    def make_governor(self):
+        return LLMQuotaGovernor(max_rate=10.0, burst=5, max_wait=1.0, min_rate_fraction=0.1,
+                                increase_fraction=0.1, decrease_interval=2.0)
+
+    def test_rate_limit_error_halves_rate_once_per_interval(self):
+        governor = self.make_governor()
+        governor.record_error(QuotaError("429"))
+        self.assertAlmostEqual(governor.rate, 5.0)
+        # Other calls failing in the same overload are not counted again
+        self.clock.advance(1.0)
+        governor.record_error(QuotaError("429"))
+        self.assertAlmostEqual(governor.rate, 5.0)
+        self.clock.advance(1.0)
+        governor.record_error(QuotaError("429"))
+        self.assertAlmostEqual(governor.rate, 2.5)
+
+    def test_rate_never_drops_below_minimum(self):
+        governor = self.make_governor()
+        for _ in range(10):
+            governor.record_error(QuotaError("429"))
+            self.clock.advance(2.0)
+        self.assertAlmostEqual(governor.rate, 1.0)
+
+    def test_other_errors_do_not_lower_rate(self):
+        governor = self.make_governor()
+        governor.record_error(ValueError("bad prompt"))
+        governor.record_error(QuotaExceededError("shed locally"))
+        self.assertAlmostEqual(governor.rate, 10.0)
+
+    def test_wrapped_rate_limit_error_is_detected(self):
+        governor = self.make_governor()
+        try:
+            try:
+                raise QuotaError("upstream")
+            except QuotaError as e:
+                raise RuntimeError("chain failed") from e
+        except RuntimeError as wrapped:
+            governor.record_error(wrapped)
+        self.assertAlmostEqual(governor.rate, 5.0)
+
+    def test_error_drains_the_bucket(self):
+        governor = self.make_governor()
+        governor.record_error(QuotaError("429"))
+        # No burst left: the next call waits for a token at the lowered rate
+        self.assertAlmostEqual(governor._reserve(), 1 / 5.0)
+
+    def test_success_recovers_linearly_up_to_max(self):
+        governor = self.make_governor()
+        governor.record_error(QuotaError("429"))
+        self.clock.advance(2.0)
+        governor.record_success()
+        # 10% of max_rate per second
+        self.assertAlmostEqual(governor.rate, 5.0 + 2.0)
+        self.clock.advance(100.0)
+        governor.record_success()
+        self.assertAlmostEqual(governor.rate, 10.0)
+
+    def test_sheds_beyond_max_wait(self):
+        governor = self.make_governor()
+        for _ in range(5 + 10):
+            governor._reserve()
+        with self.assertRaises(QuotaExceededError):
+            governor._reserve()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+import sys
+import os
+import asyncio
+import threading
+import unittest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.single_flight import SingleFlight
+
+
+class SingleFlightThreadTest(unittest.TestCase):
+    def run_concurrently(self, flight, fn, callers=5):
+        """Starts callers that all call do() while the first is still inside fn; returns their outcomes."""
+        outcomes = [None] * callers
+
+        def call(i):
+            try:
+                outcomes[i] = ("ok", flight.do("key", fn))
+            except Exception as e:
+                outcomes[i] = ("error", e)
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(callers)]
+        for thread in threads:
+            thread.start()
+        return threads, outcomes
+
+    def test_concurrent_callers_share_one_run(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def fn():
+            calls.append(1)
+            release.wait(5)
+            return "answer"
+
+        threads, outcomes = self.run_concurrently(flight, fn)
+        # Give the others time to join the in-flight call
+        threading.Event().wait(0.2)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual({kind for kind, _ in outcomes}, {"ok"})
+        self.assertEqual(sorted(shared for _, (_, shared) in outcomes), [False, True, True, True, True])
+        self.assertEqual({result for _, (result, _) in outcomes}, {"answer"})
+
+    def test_error_reaches_every_waiter(self):
+        flight = SingleFlight()
+        release = threading.Event()
+
+        def fn():
+            release.wait(5)
+            raise ValueError("upstream failed")
+
+        threads, outcomes = self.run_concurrently(flight, fn)
+        threading.Event().wait(0.2)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        for kind, value in outcomes:
+            self.assertEqual(kind, "error")
+            self.assertIsInstance(value, ValueError)
+
+    def test_key_is_released_after_completion(self):
+        flight = SingleFlight()
+        self.assertEqual(flight.do("key", lambda: 1), (1, False))
+        self.assertEqual(flight.in_flight(), 0)
+        # A later call runs again instead of reusing the finished one
+        self.assertEqual(flight.do("key", lambda: 2), (2, False))
+
+        with self.assertRaises(RuntimeError):
+            flight.do("key", self.fail_with_runtime_error)
+        self.assertEqual(flight.in_flight(), 0)
+        self.assertEqual(flight.do("key", lambda: 3), (3, False))
+
+    @staticmethod
+    def fail_with_runtime_error():
+        raise RuntimeError("boom")
+
+
+class SingleFlightAsyncTest(unittest.TestCase):
+    def test_concurrent_callers_share_one_run(self):
+        async def scenario():
+            flight = SingleFlight()
+            calls = []
+
+            async def fn():
+                calls.append(1)
+                await asyncio.sleep(0.05)
+                return "answer"
+
+            results = await asyncio.gather(*(flight.do_async("key", fn) for _ in range(5)))
+            self.assertEqual(len(calls), 1)
+            self.assertEqual(sorted(shared for _, shared in results), [False, True, True, True, True])
+            self.assertEqual({result for result, _ in results}, {"answer"})
+            self.assertEqual(flight.in_flight(), 0)
+
+        asyncio.run(scenario())
+
+    def test_error_reaches_every_waiter(self):
+        async def scenario():
+            flight = SingleFlight()
+
+            async def fn():
+                await asyncio.sleep(0.05)
+                raise ValueError("upstream failed")
+
+            results = await asyncio.gather(
+                *(flight.do_async("key", fn) for _ in range(3)), return_exceptions=True
+            )
+            for result in results:
+                self.assertIsInstance(result, ValueError)
+            self.assertEqual(flight.in_flight(), 0)
+
+        asyncio.run(scenario())
+
+    def test_key_is_released_after_completion(self):
+        async def scenario():
+            flight = SingleFlight()
+
+            async def value(v):
+                return v
+
+            self.assertEqual(await flight.do_async("key", lambda: value(1)), (1, False))
+            # The cleanup callback runs on the next loop iteration
+            await asyncio.sleep(0)
+            self.assertEqual(flight.in_flight(), 0)
+            self.assertEqual(await flight.do_async("key", lambda: value(2)), (2, False))
+
+        asyncio.run(scenario())
+
+    def test_cancelling_first_caller_does_not_cancel_shared_run(self):
+        async def scenario():
+            flight = SingleFlight()
+            release = asyncio.Event()
+            calls = []
+
+            async def fn():
+                calls.append(1)
+                await release.wait()
+                return "answer"
+
+            # The first caller disconnects while a second is waiting on the same run
+            first = asyncio.ensure_future(flight.do_async("key", fn))
+            await asyncio.sleep(0)
+            second = asyncio.ensure_future(flight.do_async("key", fn))
+            await asyncio.sleep(0)
+            first.cancel()
+            await asyncio.sleep(0)
+            release.set()
+
+            self.assertEqual(await second, ("answer", True))
+            self.assertTrue(first.cancelled())
+            self.assertEqual(len(calls), 1)
+
+        asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    unittest.main()
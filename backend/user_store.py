@@ -0,0 +1,181 @@
+import json
+import os
+from abc import ABC, abstractmethod
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+USERS_FILE = Path("data/users.json")
+USERS_DB = Path("data/users.db")
+
+
+class UserRepository(ABC):
+    """Storage for registered users. Users are dicts with username, role and hashed_password."""
+
+    @abstractmethod
+    def get(self, username: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def add(self, user: dict) -> bool:
+        """Stores a new user; returns False if the username is already taken."""
+
+    @abstractmethod
+    def count(self) -> int:
+        ...
+
+
+class JSONUserRepository(UserRepository):
+    """
+    The original users.json store. The file is kept parsed in memory and only
+    re-read when its mtime changes (e.g. another worker registered someone).
+    Every registration rewrites the whole file, so this is only meant for
+    small deployments and as the source for migrating to SQLite.
+    """
+
+    def __init__(self, path: Path = USERS_FILE):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._users = {}
+        self._mtime = None
+        self._loaded = False
+
+    def _load(self) -> dict:
+        if not self.path.exists():
+            # Ensure parent directory exists
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            return {}
+        try:
+            return self.read()
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def read(self) -> dict:
+        """Parses the file, raising if it is unreadable or corrupt (e.g. truncated by an old non-atomic save)."""
+        with open(self.path, "r") as f:
+            users = json.load(f)
+        if not isinstance(users, dict):
+            raise ValueError(f"{self.path} does not contain a JSON object of users")
+        return users
+
+    def _refresh(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if self._loaded and mtime == self._mtime:
+            return
+        with self._lock:
+            self._users = self._load()
+            self._mtime = mtime
+            self._loaded = True
+
+    def all(self) -> dict:
+        self._refresh()
+        return dict(self._users)
+
+    def get(self, username: str) -> Optional[dict]:
+        self._refresh()
+        return self._users.get(username)
+
+    def add(self, user: dict) -> bool:
+        with self._lock:
+            users = self._load()
+            if user["username"] in users:
+                return False
+            users[user["username"]] = user
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(users, f, indent=4)
+            os.replace(tmp_path, self.path)
+            self._loaded = False
+        return True
+
+    def count(self) -> int:
+        self._refresh()
+        return len(self._users)
+
+
+class SQLiteUserRepository(UserRepository):
+    """
+    Users in an indexed SQLite table (WAL mode, username primary key), so a
+    registration is one INSERT and lookups are a primary-key read. The
+    uniqueness check is the constraint itself, which stays correct when
+    several workers register concurrently. Users from legacy_file are
+    imported once.
+    """
+
+    def __init__(self, db_path: Path = USERS_DB, legacy_file: Optional[Path] = USERS_FILE):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS users (
+                username TEXT PRIMARY KEY,
+                role TEXT NOT NULL,
+                hashed_password TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.commit()
+        if legacy_file:
+            self._migrate_from_json(Path(legacy_file))
+
+    def _migrate_from_json(self, legacy_file: Path):
+        with self._lock:
+            done = self._conn.execute("SELECT value FROM meta WHERE key = 'migrated_users_json'").fetchone()
+            if done or not legacy_file.exists():
+                return
+            # Raises on a corrupt file: better to fail startup than to mark it migrated and lose every account
+            users = JSONUserRepository(legacy_file).read()
+            with self._conn:
+                # INSERT OR IGNORE keeps it idempotent if another worker migrates at the same time
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO users (username, role, hashed_password, created_at) VALUES (?, ?, ?, ?)",
+                    [(user["username"], user["role"], user["hashed_password"], time.time()) for user in users.values()],
+                )
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_users_json', ?)",
+                                   (str(len(users)),))
+            print(f"DEBUG: Migrated {len(users)} users from {legacy_file} to {self.db_path}")
+
+    def get(self, username: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT username, role, hashed_password FROM users WHERE username = ?", (username,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"username": row[0], "role": row[1], "hashed_password": row[2]}
+
+    def add(self, user: dict) -> bool:
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT INTO users (username, role, hashed_password, created_at) VALUES (?, ?, ?, ?)",
+                    (user["username"], user["role"], user["hashed_password"], time.time()),
+                )
+            return True
+        except sqlite3.IntegrityError:
+            return False
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+
+def create_user_repository() -> UserRepository:
+    """Selects the user store from USER_STORE_BACKEND (sqlite or json)."""
+    backend = os.getenv("USER_STORE_BACKEND", "sqlite").lower()
+    if backend == "json":
+        return JSONUserRepository(Path(os.getenv("USERS_FILE", str(USERS_FILE))))
+    return SQLiteUserRepository(
+        Path(os.getenv("USER_DB_PATH", str(USERS_DB))),
+        legacy_file=Path(os.getenv("USERS_FILE", str(USERS_FILE))),
+    )
@@ -28,7 +28,7 @@ def test_optimizations():
     query = "What is the syllabus?"
     print(f"First Call: '{query}' (Simulating LLM call...)")
     # Mocking the cache for this test to avoid real LLM call if no docs
-    rag.ANSWER_CACHE[query.lower()] = ("Cached Answer", [])
+    rag.answer_cache.put(rag._normalize_question(query), "Cached Answer", [])
     
     start = time.time()
     ans, src = rag.answer_question(query)
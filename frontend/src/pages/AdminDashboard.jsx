@@ -89,13 +89,22 @@ const AdminDashboard = () => {
                     ...getAuthHeader()
                 },
             });
-            setStatus({ type: 'success', message: `Successfully uploaded ${file.name}` });
-            if (response.data.summary) {
-                setSummary(response.data.summary);
-            }
+            const uploadedName = file.name;
+            setStatus({ type: 'success', message: `Uploaded ${uploadedName}, processing...` });
             setFile(null);
             setDepartment('');
             setSemester('');
+
+            // Ingestion runs in the background; poll the job until it finishes
+            const job = await pollJob(response.data.job_id, uploadedName);
+            if (job.stage === 'done') {
+                setStatus({ type: 'success', message: `Successfully uploaded ${uploadedName}` });
+                if (job.summary) {
+                    setSummary(job.summary);
+                }
+            } else {
+                setStatus({ type: 'error', message: job.error || 'Failed to process document.' });
+            }
             // Refresh data
             fetchStats();
             fetchDocuments();
@@ -107,6 +116,23 @@ const AdminDashboard = () => {
         }
     };
 
+    const pollJob = async (jobId, filename) => {
+        while (true) {
+            await new Promise(resolve => setTimeout(resolve, 2000));
+            const response = await axios.get(`${API_BASE_URL}/api/jobs/${jobId}`, { headers: getAuthHeader() });
+            const job = response.data;
+            if (job.stage === 'done' || job.stage === 'failed') {
+                return job;
+            }
+            let message = `Processing ${filename}: ${job.stage}`;
+            if (job.stage === 'embedding' && job.chunks_total) {
+                message += ` (${job.chunks_embedded}/${job.chunks_total} chunks`;
+                message += job.eta_seconds != null ? `, ~${Math.ceil(job.eta_seconds)}s left)` : ')';
+            }
+            setStatus({ type: 'success', message });
+        }
+    };
+
     const handleDelete = async (filename) => {
         if (!window.confirm(`Are you sure you want to delete ${filename}?`)) return;
 
@@ -1,22 +1,22 @@
 import os
+import json
+import asyncio
+import math
 import shutil
 from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from backend.models import QueryRequest, QueryResponse
 from backend.rag_engine import RAGService
-
-# Rate Limiter Imports
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-from starlette.requests import Request
+from backend.jobs import IngestionJobQueue
+from backend.rate_limit import create_user_rate_limiter
 
 app = FastAPI(title="College Document Chatbot API")
 
-# Rate Limiter setup
-limiter = Limiter(key_func=get_remote_address)
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+# Chat rate limits are per authenticated user (limits per role), not per IP:
+# a whole campus behind one NAT shares an address. RATE_LIMIT_BACKEND=sqlite
+# shares the buckets across uvicorn workers (otherwise the limits are per worker)
+chat_rate_limiter = create_user_rate_limiter()
 
 # CORS setup
 app.add_middleware(
@@ -33,18 +33,38 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize RAG Service
+# Initialize RAG Service (cheap; heavy components are built by warm_up on startup)
 rag_service = RAGService()
+ingestion_jobs = IngestionJobQueue(rag_service)
 
 # Auth Router
 from backend.auth import router as auth_router, get_current_admin_user, get_current_student_user, User
 app.include_router(auth_router, prefix="/auth", tags=["auth"])
 
+# Plain def: FastAPI runs it in the threadpool, so the SQLite limiter never blocks the event loop
+def rate_limited_student_user(current_user: User = Depends(get_current_student_user)):
+    retry_after = chat_rate_limiter.check(current_user.username, current_user.role)
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests. Please slow down.",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+    return current_user
+
 @app.on_event("startup")
 async def startup_event():
     # Ensure directories exist
     os.makedirs("data/tmp", exist_ok=True)
     os.makedirs("data/vector_stores", exist_ok=True)
+    # Build embeddings, vector store and LLM clients in the background so the
+    # server accepts connections immediately; /ready reports when they are done
+    asyncio.get_running_loop().run_in_executor(None, rag_service.warm_up)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    ingestion_jobs.shutdown()
+    rag_service.metrics.stop()
 
 @app.get("/")
 def root():
@@ -54,7 +74,15 @@ def root():
 async def health_check():
     return {"status": "ok"}
 
-@app.post("/api/upload")
+@app.get("/ready")
+async def readiness_check():
+    # Unlike /health, only ok once the RAG components are built and usable
+    if rag_service.is_ready:
+        return {"status": "ready", "init_timings": rag_service.init_timings}
+    status = "failed" if rag_service.startup_error else "starting"
+    return JSONResponse(status_code=503, content={"status": status, "error": rag_service.startup_error})
+
+@app.post("/api/upload", status_code=202)
 async def upload_document(
     file: UploadFile = File(...),
     department: str = Form(...),
@@ -73,31 +101,35 @@ async def upload_document(
             "semester": semester
         }
         
-        # Trigger processing with metadata
-        success = rag_service.process_document(temp_path, metadata)
-        
-        if success:
-            # Generate summary
-            summary = rag_service.generate_summary(temp_path)
-            return {
-                "message": f"Successfully uploaded {file.filename} for {department} - {semester}",
-                "summary": summary
-            }
-        else:
-            raise HTTPException(status_code=500, detail="Failed to process document")
+        # Processing and summary run in the background; poll /api/jobs/{job_id}
+        job_id = ingestion_jobs.enqueue(temp_path, metadata)
+        return {
+            "message": f"Queued {file.filename} for {department} - {semester}",
+            "job_id": job_id
+        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, current_user: User = Depends(get_current_admin_user)):
+    job = ingestion_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 @app.post("/api/chat", response_model=QueryResponse)
-@limiter.limit("1000/minute")
 async def chat_endpoint(
-    request: Request, # Required for limiter
     body: QueryRequest,
-    current_user: User = Depends(get_current_student_user)
+    current_user: User = Depends(rate_limited_student_user)
 ):
     print(f"DEBUG: chat_endpoint received request: {body}")
     try:
-        answer, sources = rag_service.answer_question(body.question)
+        answer, sources = await rag_service.answer_question_async(
+            body.question,
+            department=body.department,
+            semester=body.semester,
+            session_id=current_user.username,
+        )
         return QueryResponse(answer=answer, sources=sources)
     except Exception as e:
         print(f"DEBUG ERROR: {e}")
@@ -105,6 +137,27 @@ async def chat_endpoint(
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/chat/stream")
+async def chat_stream_endpoint(
+    body: QueryRequest,
+    current_user: User = Depends(rate_limited_student_user)
+):
+    # Server-Sent Events: sources first, then answer tokens, then done/error
+    async def event_stream():
+        async for event in rag_service.answer_question_stream(
+            body.question,
+            department=body.department,
+            semester=body.semester,
+            session_id=current_user.username,
+        ):
+            yield f"data: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.get("/api/stats")
 async def get_stats(current_user: User = Depends(get_current_admin_user)):
     try:
@@ -1,40 +1,61 @@
 import os
-import shutil
+import argparse
 from pathlib import Path
-from backend.rag_engine import RAGService
+from backend.index_manifest import IndexManifest
+from backend.rag_engine import RAGService, SUPPORTED_EXTENSIONS
 from dotenv import load_dotenv
 
 load_dotenv()
 
-def reindex():
+def reindex(incremental=False):
     print("--- Starting Re-indexing Process ---")
     
     vector_store_dir = Path("data/vector_stores/college_docs")
-    if vector_store_dir.exists():
-        print(f"Deleting existing vector store at {vector_store_dir}...")
-        shutil.rmtree(vector_store_dir)
-    
-    print("Initializing fresh RAGService...")
-    rag = RAGService()
-    
     tmp_dir = Path("data/tmp")
     if not tmp_dir.exists():
         print("Error: data/tmp directory not found.")
         return
+
+    if incremental:
+        # Only changed files are re-processed; stale chunks are deleted, new ones added
+        print("Incremental mode: applying changes against the index manifest...")
+        rag = RAGService()
+        result = rag.reindex_directory(tmp_dir, default_metadata={"department": "Unknown", "semester": "Unknown"})
+        print(f"Indexed/verified: {len(result['indexed'])}, failed: {len(result['failed'])}, removed: {len(result['removed'])}")
+        for name in result["failed"]:
+            print(f"Failed to re-index {name}")
+        print("--- Re-indexing Complete ---")
+        return
+
+    rag = RAGService()
+
+    # Keep the metadata recorded at upload time before wiping the index
+    # (one manifest per embeddings backend collection)
+    known_metadata = {}
+    # Older installs may only have the JSON manifest; opening it imports that
+    manifest_paths = {path.with_suffix(".db") for pattern in ("index_manifest*.db", "index_manifest*.json")
+                      for path in vector_store_dir.glob(pattern)}
+    for manifest_path in sorted(manifest_paths):
+        manifest = IndexManifest(manifest_path)
+        known_metadata.update(manifest.metadata())
+        manifest.close()
+
+    # Only this backend's collection, keyword index and manifest; other backends and the embedding cache stay
+    print(f"Clearing the {rag.collection_name} collection in {vector_store_dir}...")
+    rag.reset_index()
     
     files = list(tmp_dir.glob("*"))
     print(f"Found {len(files)} files to re-index.")
     
     for file_path in files:
-        if file_path.is_file() and file_path.suffix.lower() in [".pdf", ".docx", ".txt", ".csv"]:
+        if file_path.is_file() and file_path.suffix.lower() in SUPPORTED_EXTENSIONS:
             print(f"Processing {file_path.name}...")
-            # Mocking metadata as it was originally provided during upload
-            # In a real scenario, we might want to store this metadata somewhere else
-            metadata = {
+            # Metadata as originally provided during upload, if the manifest recorded it
+            metadata = known_metadata.get(file_path.name, {
                 "source": file_path.name,
                 "department": "Unknown",
                 "semester": "Unknown"
-            }
+            })
             success = rag.process_document(str(file_path), metadata)
             if success:
                 print(f"Successfully re-indexed {file_path.name}")
@@ -44,4 +65,7 @@ def reindex():
     print("--- Re-indexing Complete ---")
 
 if __name__ == "__main__":
-    reindex()
+    parser = argparse.ArgumentParser(description="Rebuild the college_docs vector store from data/tmp")
+    parser.add_argument("--incremental", action="store_true", help="Only re-index files that changed since the last run")
+    args = parser.parse_args()
+    reindex(incremental=args.incremental)